@@ -0,0 +1,75 @@
+"""
+基準測試共用工具：延遲統計、結果保存與回歸比較
+"""
+
+import json
+import math
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """已排序數列的百分位數（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], elapsed: Optional[float] = None) -> Dict:
+    """將延遲樣本（秒）整理為吞吐量與 p50/p99（毫秒）"""
+    values = sorted(latencies)
+    total = elapsed if elapsed is not None else sum(values)
+    return {
+        'iterations': len(values),
+        'ops_per_sec': round(len(values) / total, 2) if total > 0 else 0.0,
+        'mean_ms': round(sum(values) / len(values) * 1000, 4) if values else 0.0,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 4),
+        'max_ms': round(values[-1] * 1000, 4) if values else 0.0,
+    }
+
+
+def environment() -> Dict:
+    """記錄執行環境，方便比較不同機器的結果"""
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save_results(path: str, benchmark: str, results: List[Dict], config: Dict):
+    """保存結果為 JSON"""
+    payload = {
+        'benchmark': benchmark,
+        'environment': environment(),
+        'config': config,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 結果已保存到 {path}")
+
+
+def compare_results(baseline_path: str, results: List[Dict], key_fields=('size', 'case'), metric: str = 'p50_ms'):
+    """與先前保存的結果比較並列出變化"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {tuple(row.get(k) for k in key_fields): row for row in baseline.get('results', [])}
+
+    print(f"\n📊 與 {baseline_path} 比較 ({metric}):")
+    for row in results:
+        key = tuple(row.get(k) for k in key_fields)
+        old = previous.get(key)
+        if not old or not old.get(metric):
+            continue
+        change = (row[metric] - old[metric]) / old[metric] * 100
+        marker = '⚠️ ' if change > 10 else '  '
+        label = ' '.join(str(k) for k in key)
+        print(f"{marker}{label:<40} {old[metric]:>10.3f} → {row[metric]:>10.3f} ({change:+.1f}%)")
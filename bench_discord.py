@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Discord 訊息路徑壓測：以假的機器人用戶、頻道與訊息 send/edit API 驅動
+main.on_message / search_and_reply，重播錄製或合成的標記訊息流，
+測量端到端吞吐量、事件循環延遲與尾延遲，不需連線 Discord
+
+用法:
+    python bench_discord.py --messages 2000 --rate 500 --items 10000
+    python bench_discord.py --trace trace.jsonl --output bench_discord.json
+
+trace.jsonl 每行一個 {"t": 相對秒數, "content": "訊息內容"}；
+content 中的 {bot} 會被替換為機器人的標記。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+from bench_common import save_results, summarize
+from synthetic_catalog import generate_records
+
+BOT_ID = 100000000000000001
+
+
+class FakeUser:
+    """模擬 discord.User / ClientUser"""
+
+    def __init__(self, user_id: int, name: str, bot: bool = False):
+        self.id = user_id
+        self.name = name
+        self.bot = bot
+        self.mention = f'<@{user_id}>'
+
+    def mentioned_in(self, message) -> bool:
+        return self.mention in message.content or f'<@!{self.id}>' in message.content
+
+    def __eq__(self, other):
+        return isinstance(other, FakeUser) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.name
+
+
+class FakeDiscordAPI:
+    """模擬 Discord REST 延遲並記錄每次呼叫耗時"""
+
+    def __init__(self, latency: float, rng: random.Random):
+        self.latency = latency
+        self.rng = rng
+        self.calls = {'send': [], 'edit': []}
+
+    async def call(self, operation: str):
+        start = time.perf_counter()
+        if self.latency > 0:
+            # 對數常態延遲，模擬偶爾較慢的 API 回應
+            await asyncio.sleep(self.rng.lognormvariate(0, 0.5) * self.latency)
+        self.calls[operation].append(time.perf_counter() - start)
+
+
+class FakeMessage:
+    """模擬 discord.Message，edit 完成即視為回覆結束"""
+
+    def __init__(self, api: FakeDiscordAPI, content: str = '', author=None, channel=None, on_edit=None):
+        self.api = api
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.mentions = []
+        self.embeds = []
+        self.on_edit = on_edit
+
+    async def edit(self, embed=None, **kwargs):
+        await self.api.call('edit')
+        self.embeds = [embed]
+        if self.on_edit:
+            self.on_edit()
+        return self
+
+
+class FakeChannel:
+    """模擬 discord.TextChannel"""
+
+    def __init__(self, api: FakeDiscordAPI, channel_id: int):
+        self.api = api
+        self.id = channel_id
+        self.pending_edit = None  # 由驅動程式設置，send 返回的訊息 edit 時回報完成
+
+    async def send(self, content=None, embed=None, **kwargs):
+        await self.api.call('send')
+        message = FakeMessage(self.api, content or '', channel=self, on_edit=self.pending_edit)
+        message.embeds = [embed]
+        return message
+
+
+def synthetic_trace(items, count: int, rate: float, rng: random.Random):
+    """產生合成訊息流：熱門查詢呈長尾分佈，並混入模糊與無匹配查詢"""
+    names = [item.item_name for item in items]
+    hot = rng.sample(names, min(50, len(names)))
+    trace = []
+    t = 0.0
+    for _ in range(count):
+        t += rng.expovariate(rate) if rate > 0 else 0.0
+        roll = rng.random()
+        if roll < 0.6:
+            keyword = hot[min(int(rng.paretovariate(1.0)) - 1, len(hot) - 1)]
+        elif roll < 0.85:
+            keyword = rng.choice(names)
+        elif roll < 0.95:
+            name = rng.choice(names)
+            keyword = name[:max(2, len(name) // 2)]
+        else:
+            keyword = ''.join(rng.choice('龘靐齉爩麤鱻') for _ in range(3))
+        trace.append({'t': t, 'content': '{bot} ' + keyword})
+    return trace
+
+
+def load_trace(path: str):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def monitor_loop_lag(interval: float, samples: list, stop: asyncio.Event):
+    """以固定間隔 sleep 並記錄實際超出的時間作為事件循環延遲"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def replay(main, trace, args, rng: random.Random):
+    """依時間戳派發訊息，等待所有回覆完成"""
+    api = FakeDiscordAPI(args.api_latency, rng)
+    bot_user = FakeUser(BOT_ID, 'ArtaleBot', bot=True)
+    main.bot._connection.user = bot_user
+    channel_ids = [200 + i for i in range(args.channels)]
+    users = [FakeUser(300 + i, f'player{i}') for i in range(args.users)]
+
+    latencies = []
+    done = asyncio.Event()
+    remaining = len(trace)
+
+    async def handle(entry):
+        nonlocal remaining
+        received = time.perf_counter()
+        finished = []
+        # 每條訊息使用獨立的頻道物件，使 edit 完成時能對應到這條訊息
+        channel = FakeChannel(api, rng.choice(channel_ids))
+        channel.pending_edit = lambda: finished.append(time.perf_counter())
+        message = FakeMessage(api, entry['content'].replace('{bot}', bot_user.mention),
+                              author=rng.choice(users), channel=channel)
+        try:
+            await main.on_message(message)
+        finally:
+            if finished:
+                latencies.append(finished[-1] - received)
+            remaining -= 1
+            if remaining == 0:
+                done.set()
+
+    lag_samples = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(args.lag_interval, lag_samples, stop))
+
+    started = time.perf_counter()
+    tasks = []
+    for entry in trace:
+        delay = entry.get('t', 0) - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # 與 discord.py 分派事件相同，每條訊息一個 task
+        tasks.append(asyncio.create_task(handle(entry)))
+    if trace:
+        await done.wait()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        'messages': len(trace),
+        'replied': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'end_to_end': summarize(latencies, elapsed),
+        'loop_lag': summarize(lag_samples),
+        'discord_send': summarize(api.calls['send']),
+        'discord_edit': summarize(api.calls['edit']),
+    }
+
+
+async def run(args):
+    import main
+
+    async def skip_commands(message):
+        return None
+
+    # 假訊息無法建立指令上下文，標記訊息路徑也不需要
+    main.bot.process_commands = skip_commands
+    logging.getLogger('price_scraper').setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    items = generate_records(args.items, seed=args.seed)
+    main.scraper.next_poll_at = float('inf')
+    main.scraper._install_snapshot(items, time.time())
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(items, args.messages, args.rate, rng)
+    print(f"▶️ 重播 {len(trace):,} 條訊息（目錄 {len(items):,} 筆）...")
+    result = await replay(main, trace, args, rng)
+    await main.scraper.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Discord 訊息路徑壓測')
+    parser.add_argument('--trace', help='JSON lines 訊息流；未指定則使用合成訊息流')
+    parser.add_argument('--messages', type=int, default=1000, help='合成訊息數量')
+    parser.add_argument('--rate', type=float, default=200.0, help='每秒訊息數（0 表示同時送出）')
+    parser.add_argument('--items', type=int, default=5000, help='合成目錄大小')
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--api-latency', type=float, default=0.05, help='模擬 Discord API 延遲中位數（秒）')
+    parser.add_argument('--lag-interval', type=float, default=0.01, help='事件循環延遲取樣間隔（秒）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_discord.json')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    e2e, lag = result['end_to_end'], result['loop_lag']
+    print(f"✅ 完成 {result['replied']}/{result['messages']} 條回覆，耗時 {result['elapsed_s']} 秒")
+    print(f"   吞吐量 {e2e['ops_per_sec']:,.1f} 回覆/秒")
+    print(f"   端到端 p50 {e2e['p50_ms']:.1f} ms  p99 {e2e['p99_ms']:.1f} ms  max {e2e['max_ms']:.1f} ms")
+    print(f"   事件循環延遲 p50 {lag['p50_ms']:.2f} ms  p99 {lag['p99_ms']:.2f} ms  max {lag['max_ms']:.2f} ms")
+    save_results(args.output, 'discord', [result], vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+獲取策略壓測：對 mock_market_server 的各種故障情境，
+測量 _try_requests_with_retry 與 _try_selenium_fallback 的成功率與刷新耗時
+
+用法:
+    python bench_fetch.py --runs 5 --output bench_fetch.json
+    python bench_fetch.py --scenarios ok,challenge_first --strategies requests --delay-scale 1
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from bench_common import compare_results, save_results, summarize
+from mock_market_server import MockMarketServer
+from price_scraper import ArtaleMarketScraper
+
+# 情境名稱 → MockMarketServer 參數
+SCENARIOS = {
+    'ok': {},
+    'slow': {'latency': 1.0, 'jitter': 0.5},
+    'large_payload': {'items': 100000},
+    'challenge_first': {'fail_first': 2},
+    'challenge_random': {'challenge_rate': 0.5},
+    'home_challenge': {'home_mode': 'challenge'},
+    'malformed_json': {'api_mode': 'malformed'},
+    'non_json': {'api_mode': 'non_json'},
+    'server_error': {'api_mode': 'error'},
+}
+
+STRATEGIES = ('requests', 'selenium')
+
+
+def selenium_available() -> bool:
+    try:
+        import selenium  # noqa: F401
+        import webdriver_manager  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def run_scenario(name: str, strategy: str, args):
+    """對單一情境與策略重複刷新，返回統計"""
+    params = {'items': args.items, 'seed': args.seed, **SCENARIOS[name]}
+    server = MockMarketServer(**params)
+    await server.start()
+    loop = asyncio.get_running_loop()
+    durations = []
+    successes = 0
+    try:
+        for _ in range(args.runs):
+            scraper = ArtaleMarketScraper(base_url=server.url, delay_scale=args.delay_scale)
+            fetch = scraper._try_requests_with_retry if strategy == 'requests' else scraper._try_selenium_fallback
+            start = time.perf_counter()
+            items = await loop.run_in_executor(scraper.fetch_executor, scraper._run_strategy, strategy, fetch)
+            durations.append(time.perf_counter() - start)
+            if items:
+                successes += 1
+            await scraper.close()
+    finally:
+        await server.stop()
+
+    stats = summarize(durations)
+    return {
+        'scenario': name,
+        'strategy': strategy,
+        'success_rate': round(successes / args.runs, 3),
+        'upstream_requests': server.total_requests,
+        **stats,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='獲取策略壓測')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗號分隔的情境')
+    parser.add_argument('--strategies', default=','.join(STRATEGIES), help='requests,selenium')
+    parser.add_argument('--runs', type=int, default=3, help='每個情境的刷新次數')
+    parser.add_argument('--items', type=int, default=1000, help='模擬快照物品數量')
+    parser.add_argument('--delay-scale', type=float, default=0.01,
+                        help='重試等待倍率（1 為實際時間）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_fetch.json')
+    parser.add_argument('--compare', help='與先前的結果 JSON 比較')
+    args = parser.parse_args()
+
+    logging.getLogger('price_scraper').setLevel(logging.CRITICAL)
+
+    strategies = args.strategies.split(',')
+    if 'selenium' in strategies and not selenium_available():
+        print("⚠️ Selenium 未安裝，跳過 selenium 策略")
+        strategies.remove('selenium')
+
+    results = []
+    for name in args.scenarios.split(','):
+        for strategy in strategies:
+            row = await run_scenario(name, strategy, args)
+            results.append(row)
+            print(f"  {name:<18} {strategy:<9} 成功率 {row['success_rate']:>5.0%}  "
+                  f"p50 {row['p50_ms'] / 1000:>8.2f} s  p99 {row['p99_ms'] / 1000:>8.2f} s  "
+                  f"上游請求 {row['upstream_requests']}")
+
+    if args.compare:
+        compare_results(args.compare, results, key_fields=('scenario', 'strategy'))
+    save_results(args.output, 'fetch', results, vars(args))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
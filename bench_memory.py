@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+快照記憶體報告：比較原始 JSON dict 與 ItemRecord 每個物品佔用的位元組數
+
+用法:
+    python bench_memory.py --items 10000,100000
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from bench_common import save_results
+from snapshot_stream import CHUNK_SIZE, parse_snapshot_stream
+from synthetic_catalog import generate_items
+
+
+def measure_bytes(build):
+    """返回 build() 結果常駐的位元組數（保留結果直到測量結束）"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='快照記憶體報告')
+    parser.add_argument('--items', default='10000,100000', help='逗號分隔的物品數量')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_memory.json')
+    args = parser.parse_args()
+
+    results = []
+    for count in (int(n) for n in args.items.split(',')):
+        payload = json.dumps({'snapshots': generate_items(count, seed=args.seed)}, ensure_ascii=False).encode()
+        chunks = lambda: (payload[i:i + CHUNK_SIZE] for i in range(0, len(payload), CHUNK_SIZE))
+
+        dict_bytes, dict_items = measure_bytes(lambda: json.loads(payload)['snapshots'])
+        del dict_items
+        record_bytes, record_items = measure_bytes(lambda: parse_snapshot_stream(chunks()))
+        del record_items
+
+        row = {
+            'items': count,
+            'payload_bytes': len(payload),
+            'dict_bytes_per_item': round(dict_bytes / count, 1),
+            'record_bytes_per_item': round(record_bytes / count, 1),
+            'saving_percent': round((1 - record_bytes / dict_bytes) * 100, 1),
+        }
+        results.append(row)
+        print(f"{count:>8,} 個物品: dict {row['dict_bytes_per_item']:>7.1f} B/物品 → "
+              f"ItemRecord {row['record_bytes_per_item']:>7.1f} B/物品 (節省 {row['saving_percent']}%)")
+
+    save_results(args.output, 'memory', results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+搜索與排序基準測試：以 1k–100k 筆合成快照測量
+search_item_price（精確/錯字/模糊/無匹配/走完所有層級的無匹配）、get_popular_items、get_trending_items、
+get_items_by_type 與 _format_item_data 的吞吐量及 p50/p99 延遲
+
+用法:
+    python bench_search.py --sizes 1000,10000,100000 --output bench_search.json
+    python bench_search.py --compare bench_search.json
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+
+import tracing
+from bench_common import compare_results, save_results, summarize
+from price_scraper import ArtaleMarketScraper
+from search_index import typo_distance
+from synthetic_catalog import generate_records
+from text_normalize import normalize_name
+
+# 目錄中不會出現的字元，用於無匹配查詢
+_UNKNOWN_CHARS = '龘靐齉爩麤鱻驫厵灥'
+# 搜索案例預期的匹配結果；實際落在預期層級的比例低於此值時中止，避免案例悄悄改測其他層級
+MIN_EXPECTED_SHARE = 0.9
+
+
+def make_scraper(items):
+    """建立一個已安裝合成快照、不會連網更新的爬蟲實例"""
+    scraper = ArtaleMarketScraper()
+    scraper.next_poll_at = float('inf')
+    scraper._install_snapshot(items, time.time())
+    return scraper
+
+
+def _drop_middle(names, rng: random.Random, count: int, extra_edits: int, accept):
+    """從名稱中間刪去連續的字（錯字容忍距離 + extra_edits 個），只保留 accept 判定符合的查詢
+
+    只使用長度至少為刪去字數 4 倍的名稱，保留的部分足以讓模糊分數達到門檻。
+    """
+    queries = []
+    for _ in range(count * 50):
+        if len(queries) == count:
+            return queries
+        name = rng.choice(names)
+        drop = max(1, typo_distance(normalize_name(name)) + extra_edits)
+        if len(name) < drop * 4:
+            continue
+        cut = rng.randrange(1, len(name) - drop)
+        query = name[:cut] + name[cut + drop:]
+        if accept(query):
+            queries.append(query)
+    raise RuntimeError(f"無法產生足夠的查詢（{len(queries)}/{count}）")
+
+
+def _catalog_misses(names, index, rng: random.Random, count: int):
+    """由目錄中出現的中文字組成、互不重複的無匹配查詢
+
+    字元預篩無法排除，每個查詢只出現一次，負面快取也無法回答，必須走完所有匹配層級。
+    字元不依出現頻率抽樣，常見字較少，模糊分數不易達到門檻。
+    """
+    alphabet = sorted({char for name in names for char in name if '\u4e00' <= char <= '\u9fff'})
+    queries = set()
+    for _ in range(count * 50):
+        if len(queries) == count:
+            return list(queries)
+        query = ''.join(rng.choice(alphabet) for _ in range(rng.randint(10, 12)))
+        if index.lookup(query) is None and index.typo_match(query) is None \
+                and not index.contains_substring(query):
+            queries.add(query)
+    raise RuntimeError(f"無法產生足夠的查詢（{len(queries)}/{count}）")
+
+
+def make_queries(items, index, rng: random.Random, count: int, unique_count: int):
+    """產生各類查詢；以索引篩選（不影響負面快取），使每類查詢落在預期的匹配層級
+
+    unique_count 為每次執行都必須不同的查詢數量（不少於案例的最大次數）。
+    """
+    names = [item.item_name for item in items]
+    exact = [rng.choice(names) for _ in range(count)]
+    # 刪去一個字：不是名稱或其他名稱的子字串，由 BK-tree 錯字修正命中
+    typo = _drop_middle(names, rng, count, 0,
+                        lambda query: index.lookup(query) is None and index.typo_match(query) is not None)
+    # 刪去超過錯字容忍距離的字：精確與錯字修正都落空，必須走 partial_ratio 模糊評分
+    fuzzy = _drop_middle(names, rng, count, 1,
+                         lambda query: index.lookup(query) is None and index.typo_match(query) is None)
+    # 只含目錄外字元：由字元預篩或負面快取直接排除（最佳情況）
+    no_match = [''.join(rng.choice(_UNKNOWN_CHARS) for _ in range(rng.randint(2, 5))) for _ in range(count)]
+    # 只含目錄內字元且不重複：第一次未命中的完整成本
+    no_match_scan = _catalog_misses(names, index, rng, unique_count)
+    return {'search_exact': exact, 'search_typo': typo, 'search_fuzzy': fuzzy,
+            'search_no_match': no_match, 'search_no_match_scan': no_match_scan}
+
+
+def match_outcome(trace) -> str:
+    """查詢實際的匹配結果：命中層級；未命中再區分是否走完所有層級"""
+    tier = trace.attributes.get('tier', 'unknown')
+    if tier != 'miss':
+        return tier
+    reached = [span.name for span in trace.spans if span.name.startswith('match.')]
+    return 'miss_scanned' if reached and reached[-1] == 'match.partial' else 'miss_rejected'
+
+
+def check_outcomes(case: str, outcomes: Counter, expected: str):
+    """確認案例確實測量預期的匹配層級"""
+    total = sum(outcomes.values())
+    if total and outcomes[expected] / total < MIN_EXPECTED_SHARE:
+        mix = ', '.join(f'{outcome} {count}' for outcome, count in outcomes.most_common())
+        raise RuntimeError(f"{case} 預期測量 {expected}，實際匹配結果為 {mix}")
+
+
+async def measure(call, arguments, max_iterations: int, max_seconds: float, outcomes: Counter = None):
+    """重複執行並收集延遲；提供 outcomes 時每次呼叫在自己的追蹤中執行並記錄匹配結果
+
+    追蹤的建立與結束不計入延遲（正式環境的查詢同樣在追蹤中執行）。
+    """
+    latencies = []
+    started = time.perf_counter()
+    for i in range(max_iterations):
+        argument = arguments[i % len(arguments)]
+        with tracing.start_trace('bench') as trace:
+            start = time.perf_counter()
+            result = call(argument)
+            if asyncio.iscoroutine(result):
+                await result
+            latencies.append(time.perf_counter() - start)
+        if outcomes is not None:
+            outcomes[match_outcome(trace)] += 1
+        if time.perf_counter() - started > max_seconds:
+            break
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def run_size(size: int, args, rng: random.Random):
+    """對單一目錄大小執行所有案例"""
+    print(f"\n📦 生成 {size:,} 筆合成物品...")
+    items = generate_records(size, seed=args.seed)
+    scraper = make_scraper(items)
+    queries = make_queries(items, scraper._index, rng, args.queries, args.iterations)
+    types = scraper.get_available_types()
+
+    # (案例, 呼叫, 參數, 預期的匹配結果；None 表示不是搜索)
+    cases = [
+        ('search_exact', scraper.search_item_price, queries['search_exact'], 'exact'),
+        ('search_typo', scraper.search_item_price, queries['search_typo'], 'typo'),
+        ('search_fuzzy', scraper.search_item_price, queries['search_fuzzy'], 'fuzzy'),
+        ('search_no_match', scraper.search_item_price, queries['search_no_match'], 'miss_rejected'),
+        ('search_no_match_scan', scraper.search_item_price, queries['search_no_match_scan'], 'miss_scanned'),
+        ('get_popular_items', scraper.get_popular_items, [10], None),
+        ('get_trending_items', scraper.get_trending_items, [10], None),
+        ('get_items_by_type', lambda t: scraper.get_items_by_type(t, 20), types, None),
+        ('format_item_data', scraper._format_item_data, items, None),
+    ]
+
+    results = []
+    for case, call, arguments, expected in cases:
+        iterations = args.iterations * 100 if case == 'format_item_data' else args.iterations
+        outcomes = Counter() if expected else None
+        stats = await measure(call, arguments, iterations, args.max_seconds, outcomes)
+        row = {'size': size, 'case': case, **stats}
+        if outcomes is not None:
+            row['outcomes'] = dict(outcomes)
+        results.append(row)
+        print(f"  {case:<20} {stats['iterations']:>6} 次  {stats['ops_per_sec']:>12,.1f} ops/s  "
+              f"p50 {stats['p50_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms")
+        if outcomes is not None:
+            check_outcomes(case, outcomes, expected)
+    await scraper.close()
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Artale Market 搜索基準測試')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='逗號分隔的目錄大小')
+    parser.add_argument('--iterations', type=int, default=200, help='每個案例的最大次數')
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='每個案例的最長執行時間')
+    parser.add_argument('--queries', type=int, default=200, help='每類查詢的樣本數')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_search.json', help='結果 JSON 路徑')
+    parser.add_argument('--compare', help='與先前的結果 JSON 比較')
+    args = parser.parse_args()
+
+    # 避免每次匹配的 INFO 日誌影響測量
+    logging.getLogger('price_scraper').setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = []
+    for size in sizes:
+        results.extend(await run_size(size, args, rng))
+
+    if args.compare:
+        compare_results(args.compare, results)
+    save_results(args.output, 'search', results, vars(args))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
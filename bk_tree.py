@@ -0,0 +1,86 @@
+"""
+BK-tree：以編輯距離為度量的名稱索引，用於快速找出「距離 k 以內」的所有名稱
+"""
+
+from typing import Callable, Iterable, List, Optional, Tuple
+
+
+def _python_levenshtein(a: str, b: str) -> int:
+    """編輯距離（純 Python 備用實作）"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def default_distance() -> Callable[[str, str], int]:
+    """返回編輯距離函數；python-Levenshtein（已在 requirements.txt 中）在第一次建樹時才載入"""
+    try:
+        from Levenshtein import distance
+        return distance
+    except ImportError:
+        return _python_levenshtein
+
+
+class BKTree:
+    """Burkhard-Keller 樹
+
+    每個節點為 (名稱, {與子節點的距離: 子節點})。查詢時利用三角不等式，
+    只需走訪距離落在 [d - k, d + k] 的子樹。
+    """
+
+    def __init__(self, words: Iterable[str] = (), distance: Optional[Callable[[str, str], int]] = None):
+        self._distance = distance
+        self._root: Optional[tuple] = None
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        if self._distance is None:
+            self._distance = default_distance()
+        if self._root is None:
+            self._root = (word, {})
+            self.size = 1
+            return
+        node = self._root
+        while True:
+            d = self._distance(word, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, query: str, max_distance: int) -> List[Tuple[int, str]]:
+        """返回所有距離不超過 max_distance 的 (距離, 名稱)，依距離排序"""
+        if self._root is None:
+            return []
+        results = []
+        stack = [self._root]
+        while stack:
+            word, children = stack.pop()
+            d = self._distance(query, word)
+            if d <= max_distance:
+                results.append((d, word))
+            low, high = d - max_distance, d + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        results.sort()
+        return results
+
+    def __len__(self):
+        return self.size
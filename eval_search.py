@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+搜索相關性與延遲評估：以標註查詢集（查詢 → 預期 item_name）在合成快照上
+測量 top-1 準確率、漏判率、誤判率與各匹配層級的延遲
+
+匹配器為 (scraper, keyword) -> (物品或 None, 層級) 的函數（可為 async）：
+    current  目前的 ArtaleMarketScraper.match_item
+    legacy   僅小寫精確 + 模糊 + 部分關鍵詞（無正規化、別名與錯字修正）
+    module:function  自訂匹配器
+
+用法:
+    python eval_search.py
+    python eval_search.py --matcher current --matcher legacy --size 100000
+    python eval_search.py --compare eval_search.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import time
+from collections import defaultdict
+
+from bench_common import compare_results, save_results, summarize
+from bench_search import make_scraper
+from synthetic_catalog import generate_records
+
+
+async def current_matcher(scraper, keyword):
+    return await scraper.match_item(keyword)
+
+
+async def legacy_matcher(scraper, keyword):
+    """正規化與錯字修正層加入前的匹配流程"""
+    items = scraper.cached_items
+    names = scraper._index.names
+    keyword_lower = keyword.lower()
+    item = scraper._index.items_by_name.get(keyword_lower)
+    if item:
+        return item, 'exact'
+    best_index, _ = (await scraper._fuzzy_best_matches([keyword_lower], names, scraper.snapshot_version))[0]
+    if best_index >= 0:
+        return items[best_index], 'fuzzy'
+    item = scraper._partial_word_match(keyword_lower, items, names)
+    return (item, 'partial') if item else (None, 'miss')
+
+
+BUILTIN_MATCHERS = {'current': current_matcher, 'legacy': legacy_matcher}
+
+
+def load_matcher(spec: str):
+    """解析 current / legacy / module:function"""
+    if spec in BUILTIN_MATCHERS:
+        return BUILTIN_MATCHERS[spec]
+    module_name, _, function_name = spec.partition(':')
+    if not function_name:
+        raise SystemExit(f"無效的匹配器: {spec}（應為 current、legacy 或 module:function）")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+async def evaluate(scraper, matcher, queries, repeat: int):
+    """執行查詢集，返回每個查詢的結果與各層級延遲"""
+    outcomes = []
+    tier_latencies = defaultdict(list)
+    for query in queries:
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = matcher(scraper, query['query'])
+            if asyncio.iscoroutine(result):
+                result = await result
+            latencies.append(time.perf_counter() - start)
+        item, tier = result
+        tier_latencies[tier].extend(latencies)
+        outcomes.append({**query, 'actual': item.item_name if item else None, 'tier': tier})
+    return outcomes, tier_latencies
+
+
+def score(outcomes):
+    """top-1 準確率、漏判率（應命中卻未命中）與誤判率（應未命中卻返回物品）"""
+    positives = [o for o in outcomes if o['expected'] is not None]
+    negatives = [o for o in outcomes if o['expected'] is None]
+    correct = sum(1 for o in outcomes if o['actual'] == o['expected'])
+    return {
+        'queries': len(outcomes),
+        'top1_accuracy': round(correct / len(outcomes), 4) if outcomes else 0.0,
+        'miss_rate': round(sum(1 for o in positives if o['actual'] is None) / len(positives), 4) if positives else 0.0,
+        'false_positive_rate': round(sum(1 for o in negatives if o['actual'] is not None) / len(negatives), 4) if negatives else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Artale Market 搜索相關性評估')
+    parser.add_argument('--queries', default='search_eval_queries.json', help='標註查詢集 JSON')
+    parser.add_argument('--matcher', action='append', help='current、legacy 或 module:function，可重複指定')
+    parser.add_argument('--size', type=int, default=10000, help='合成快照的物品數量')
+    parser.add_argument('--repeat', type=int, default=3, help='每個查詢重複次數（延遲取全部樣本）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help='列出所有錯誤的查詢')
+    parser.add_argument('--output', default='eval_search.json', help='結果 JSON 路徑')
+    parser.add_argument('--compare', help='與先前的結果 JSON 比較')
+    args = parser.parse_args()
+    matchers = args.matcher or ['current', 'legacy']
+
+    logging.getLogger('price_scraper').setLevel(logging.WARNING)
+
+    with open(args.queries, encoding='utf-8') as f:
+        queries = json.load(f)
+    print(f"📦 生成 {args.size:,} 筆合成物品，評估 {len(queries)} 個查詢...")
+    scraper = make_scraper(generate_records(args.size, seed=args.seed))
+
+    results = []
+    for spec in matchers:
+        outcomes, tier_latencies = await evaluate(scraper, load_matcher(spec), queries, args.repeat)
+        overall = score(outcomes)
+        results.append({'matcher': spec, 'case': 'overall', **overall})
+        print(f"\n🔎 {spec}: top-1 {overall['top1_accuracy']:.1%}  漏判 {overall['miss_rate']:.1%}  "
+              f"誤判 {overall['false_positive_rate']:.1%}")
+
+        by_category = defaultdict(list)
+        for outcome in outcomes:
+            by_category[outcome['category']].append(outcome)
+        for category, group in by_category.items():
+            stats = score(group)
+            results.append({'matcher': spec, 'case': f'category:{category}', **stats})
+            print(f"  {category:<12} {stats['queries']:>3} 個  top-1 {stats['top1_accuracy']:>7.1%}")
+
+        for tier, latencies in sorted(tier_latencies.items()):
+            stats = summarize(latencies)
+            results.append({'matcher': spec, 'case': f'tier:{tier}', **stats})
+            print(f"  層級 {tier:<8} {stats['iterations'] // args.repeat:>3} 個  "
+                  f"p50 {stats['p50_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms")
+
+        wrong = [o for o in outcomes if o['actual'] != o['expected']]
+        for outcome in wrong if args.verbose else wrong[:5]:
+            print(f"  ✗ [{outcome['category']}] {outcome['query']!r} → {outcome['actual']!r}"
+                  f"（預期 {outcome['expected']!r}，層級 {outcome['tier']}）")
+        if not args.verbose and len(wrong) > 5:
+            print(f"  ...另有 {len(wrong) - 5} 個錯誤（--verbose 顯示全部）")
+
+    await scraper.close()
+    if args.compare:
+        compare_results(args.compare, results, key_fields=('matcher', 'case'), metric='top1_accuracy')
+    save_results(args.output, 'search_eval', results, vars(args))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,180 @@
+"""
+模糊評分：單進程版本與大目錄用的進程池平行版本
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 工作進程中的唯讀名稱列表與其來源檔案，收到新快照的第一個分段時載入一次
+_worker_names: Sequence[str] = ()
+_worker_path: Optional[str] = None
+
+
+def process_context():
+    """進程池使用的啟動方式
+
+    機器人進程中有 discord/aiohttp、線程池、看門狗與取樣分析器等多個線程，
+    fork 出的子進程可能卡在繼承的鎖上，因此改用 forkserver（不支援時用 spawn）。
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def fuzzy_best_match(keyword: str, names: Sequence[str], start: int = 0, end: Optional[int] = None) -> Tuple[int, int]:
+    """在小寫名稱列表 names[start:end] 中找出模糊匹配分數最高的位置，返回 (索引, 分數)；無匹配返回 (-1, 0)
+
+    分數相同時取較前面的物品。
+    """
+    # 延遲載入：啟動時不需要 fuzzywuzzy（及 python-Levenshtein）
+    from fuzzywuzzy import fuzz
+
+    best_index = -1
+    best_score = 0
+    end = len(names) if end is None else end
+    for index in range(start, end):
+        name = names[index]
+        score = fuzz.partial_ratio(keyword, name)
+
+        if keyword in name:
+            score += 20
+
+        if score > best_score and score >= 60:
+            best_score = score
+            best_index = index
+    return best_index, best_score
+
+
+def merge_matches(matches) -> Tuple[int, int]:
+    """合併各分段的 (索引, 分數)：取最高分，同分取較小索引"""
+    best_index, best_score = -1, 0
+    for index, score in matches:
+        if index < 0:
+            continue
+        if score > best_score or (score == best_score and index < best_index):
+            best_index, best_score = index, score
+    return best_index, best_score
+
+
+def _load_names(path: str) -> Sequence[str]:
+    global _worker_names, _worker_path
+    if path != _worker_path:
+        with open(path, 'rb') as f:
+            _worker_names = pickle.load(f)
+        _worker_path = path
+    return _worker_names
+
+
+def _prefetch(path: str):
+    """快照更新後先讓工作進程載入名稱與模糊評分模組，第一個查詢不必等待"""
+    from fuzzywuzzy import fuzz  # noqa: F401
+    _load_names(path)
+
+
+def _score_range(path: str, keywords: Sequence[str], start: int, end: int) -> List[Tuple[int, int]]:
+    """在工作進程中為多個關鍵字評分同一段名稱（path 為該快照的名稱檔）"""
+    names = _load_names(path)
+    return [fuzzy_best_match(keyword, names, start, end) for keyword in keywords]
+
+
+class ParallelFuzzyScorer:
+    """把名稱列表分段交給進程池評分後合併最高分
+
+    進程池在第一次需要時建立並一直使用；每個快照的名稱列表由 prepare() 在 I/O 線程中寫入暫存檔，
+    工作進程在收到新名稱檔的第一個工作時載入一次，之後每次查詢只傳送檔案路徑、關鍵字與分段範圍。
+    """
+
+    # 保留的名稱檔數量：目前快照與上一個快照（可能仍有評分中的分段）
+    KEEP_SNAPSHOTS = 2
+
+    def __init__(self, workers: int, min_items: int):
+        self.workers = max(1, workers)
+        self.min_items = min_items
+        self.version = None
+        self.size = 0
+        self.path = None
+        self._executor = None
+        self._directory = None
+        self._paths: List[str] = []
+        self._prepared = None  # (名稱列表, 名稱檔)：最近一次 prepare() 的結果
+
+    def prepare(self, names: Sequence[str]) -> Optional[str]:
+        """寫入名稱檔並讓工作進程預先載入，返回檔案路徑；目錄小於門檻時返回 None
+
+        在 I/O 線程中與搜索索引一起呼叫，避免序列化名稱與啟動工作進程佔用事件循環。
+        """
+        if len(names) < self.min_items:
+            return None
+        if self._executor is None:
+            self._directory = tempfile.mkdtemp(prefix='artale-fuzzy-')
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context())
+        descriptor, path = tempfile.mkstemp(suffix='.pickle', dir=self._directory)
+        with os.fdopen(descriptor, 'wb') as f:
+            pickle.dump(list(names), f, protocol=pickle.HIGHEST_PROTOCOL)
+        for _ in range(self.workers):
+            self._executor.submit(_prefetch, path)
+        self._prepared = (names, path)
+        return path
+
+    def load(self, names: Sequence[str], version: int):
+        """改用新快照的名稱檔（同一個名稱列表已經 prepare() 過則直接使用）；目錄小於門檻時不使用進程池"""
+        self.version = None
+        self.size = 0
+        prepared = self._prepared
+        path = prepared[1] if prepared is not None and prepared[0] is names else self.prepare(names)
+        if path is None:
+            return
+        self._paths.append(path)
+        while len(self._paths) > self.KEEP_SNAPSHOTS:
+            try:
+                os.remove(self._paths.pop(0))
+            except OSError:
+                pass
+        self.path = path
+        self.version = version
+        self.size = len(names)
+        logger.info(f"平行模糊評分已載入 {len(names)} 個名稱（{self.workers} 個進程）")
+
+    def ready_for(self, version: int) -> bool:
+        return self._executor is not None and self.version == version
+
+    def queue_depth(self) -> int:
+        return len(self._executor._pending_work_items) if self._executor is not None else 0
+
+    def _ranges(self):
+        # 分段數多於進程數，讓較快的進程多分擔
+        chunks = self.workers * 2
+        step = -(-self.size // chunks)
+        return [(start, min(start + step, self.size)) for start in range(0, self.size, step)]
+
+    async def best_matches(self, keywords: Sequence[str]) -> List[Tuple[int, int]]:
+        """批量評分，返回與 keywords 對應的 (索引, 分數)；被取消時尚未開始的分段也會取消"""
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self._executor, _score_range, self.path, list(keywords), start, end)
+                   for start, end in self._ranges()]
+        partials = await asyncio.gather(*futures)
+        return [merge_matches(partial[i] for partial in partials) for i in range(len(keywords))]
+
+    async def best_match(self, keyword: str) -> Tuple[int, int]:
+        return (await self.best_matches([keyword]))[0]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self._paths = []
+        self._prepared = None
+        self.path = None
+        self.version = None
+        self.size = 0
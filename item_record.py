@@ -0,0 +1,84 @@
+"""
+快照物品的精簡記錄：以 __slots__ 取代原始 JSON dict，
+類型、名稱與日期字串經過 intern，價格欄位統一為整數
+"""
+
+import sys
+from operator import attrgetter
+from typing import Dict, Iterable, Optional
+
+_intern = sys.intern
+
+
+def _to_int(value) -> int:
+    if value is None:
+        return 0
+    return int(value)
+
+
+def _to_float(value) -> float:
+    if value is None:
+        return 0.0
+    return float(value)
+
+
+class ItemRecord:
+    """單一物品的價格快照"""
+
+    __slots__ = ('item_name', 'item_type', 'low', 'median', 'high', 'volume',
+                 'recent_change_percent', 'snapshot_date')
+
+    def __init__(self, item_name: str, item_type: str, low: int, median: int, high: int,
+                 volume: int, recent_change_percent: float, snapshot_date: str):
+        self.item_name = _intern(item_name)
+        self.item_type = _intern(item_type)
+        self.low = low
+        self.median = median
+        self.high = high
+        self.volume = volume
+        self.recent_change_percent = recent_change_percent
+        self.snapshot_date = _intern(snapshot_date)
+
+    @classmethod
+    def from_dict(cls, raw) -> Optional['ItemRecord']:
+        """由 API 返回的 dict 建立記錄，只保留使用到的欄位；無效物品返回 None"""
+        if not isinstance(raw, dict):
+            return None
+        name = raw.get('item_name')
+        if not isinstance(name, str) or not name:
+            return None
+        try:
+            return cls(
+                name,
+                str(raw.get('item_type') or ''),
+                _to_int(raw.get('low')),
+                _to_int(raw.get('median')),
+                _to_int(raw.get('high')),
+                _to_int(raw.get('volume')),
+                _to_float(raw.get('recent_change_percent')),
+                str(raw.get('snapshot_date') or ''),
+            )
+        except (TypeError, ValueError):
+            return None
+
+    def to_dict(self) -> Dict:
+        """轉回與 API 相同格式的 dict"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other):
+        if not isinstance(other, ItemRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ItemRecord({self.item_name!r}, {self.item_type!r}, median={self.median}, volume={self.volume})"
+
+
+_record_fields = attrgetter(*ItemRecord.__slots__)
+
+
+def snapshot_fingerprint(items: Iterable[ItemRecord]) -> int:
+    """快照內容的指紋（同一進程內比較用）：所有物品、所有欄位與順序都相同時才相等"""
+    return hash(tuple(map(_record_fields, items)))
@@ -0,0 +1,131 @@
+"""
+事件循環延遲監控：事件循環上的計時協程持續測量延遲，另一個監控線程在
+延遲超過門檻時擷取事件循環線程當下的堆疊與正在執行的任務，找出阻塞的呼叫
+"""
+
+import asyncio
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 計時協程的取樣間隔（秒）
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', 0.1))
+# 延遲超過此毫秒數時記錄阻塞的堆疊
+LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', 250))
+# 計算百分位數時保留的最近樣本數（預設間隔下約 5 分鐘）
+LAG_WINDOW = 3000
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _describe_task(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return '（非任務的回調）'
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', repr(coro))})"
+
+
+class LoopWatchdog:
+    """測量事件循環延遲，並在阻塞時記錄事件循環線程的堆疊"""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.lags = deque(maxlen=LAG_WINDOW)
+        self.stalls = deque(maxlen=20)  # 最近的阻塞紀錄
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = 0.0
+        self._reported_tick = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """在事件循環上啟動計時協程與監控線程"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.perf_counter()
+        self._ticker = asyncio.create_task(self._tick(), name='loop-watchdog')
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def _tick(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self._last_tick = now
+            self.lags.append(lag)
+            metrics.LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                metrics.LOOP_STALLS.inc()
+                logger.warning(f"事件循環延遲 {lag * 1000:.0f} ms")
+
+    def _watch(self):
+        """監控線程：計時協程太久沒有執行時擷取事件循環線程的堆疊（每次阻塞只記錄一次）"""
+        check_interval = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(check_interval):
+            last_tick = self._last_tick
+            blocked = time.perf_counter() - last_tick - self.interval
+            if blocked < self.threshold or self._reported_tick == last_tick:
+                continue
+            self._reported_tick = last_tick
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+            try:
+                # 從其他線程讀取目前任務：只讀取，不影響事件循環
+                task = asyncio.current_task(self._loop)
+            except RuntimeError:
+                task = None
+            stall = {
+                'time': time.time(),
+                'blocked_ms': round(blocked * 1000, 1),
+                'task': _describe_task(task),
+                'stack': stack,
+            }
+            self.stalls.append(stall)
+            logger.warning(f"事件循環已阻塞至少 {stall['blocked_ms']:.0f} ms，正在執行: {stall['task']}\n{stack}")
+
+    def lag_percentile(self, fraction: float) -> Optional[float]:
+        """最近樣本的延遲百分位數（秒）"""
+        if not self.lags:
+            return None
+        return _percentile(sorted(self.lags), fraction)
+
+    def register_metrics(self):
+        """把延遲百分位數匯出為 artale_event_loop_lag_quantile_seconds"""
+        for quantile in (0.5, 0.9, 0.99, 1.0):
+            metrics.LOOP_LAG_QUANTILE.set_function(
+                lambda q=quantile: self.lag_percentile(q),
+                quantile=str(quantile)
+            )
+
+    def recent_stalls(self) -> List[Dict]:
+        return list(self.stalls)
@@ -1,11 +1,24 @@
+import time
+BOOT_STARTED = time.perf_counter()  # 在其他模組載入前記錄，用於啟動階段計時
+
 import discord
 from discord.ext import commands
 import asyncio
+import contextvars
+import logging
 import os
 import re
-import threading
+import signal
+from datetime import datetime, timezone
 from typing import Optional, List, Dict
-from price_scraper import ArtaleMarketScraper
+from price_scraper import PREWARM_TOP_N, ArtaleMarketScraper
+from snapshot_rankings import RankingCursor
+from price_index import parse_price_range
+from web_server import WebServer
+import metrics
+import tracing
+from sampling_profiler import SamplingProfiler
+from loop_watchdog import LoopWatchdog
 # 載入.env文件（本地開發用）
 try:
     from dotenv import load_dotenv
@@ -14,6 +27,8 @@ try:
 except ImportError:
     print("⚠️ python-dotenv未安裝，跳過.env文件載入")
 
+logging.basicConfig(level=logging.INFO)
+
 # 機器人設定
 intents = discord.Intents.default()
 intents.message_content = True
@@ -22,12 +37,54 @@ bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
 
 # 創建價格查詢實例
 scraper = ArtaleMarketScraper()
+metrics.SNAPSHOT_AGE_SECONDS.set_function(scraper.snapshot_age)
+metrics.UPSTREAM_REFRESH_FAILURES.set_function(lambda: scraper.refresh_failures)
+metrics.NEXT_POLL_SECONDS.set_function(lambda: max(0.0, scraper.next_poll_at - time.time()) if scraper.next_poll_at else None)
+metrics.EXECUTOR_QUEUE_DEPTH.set_function(lambda: scraper.executor_queue_depth('fetch'), executor='fetch')
+metrics.EXECUTOR_QUEUE_DEPTH.set_function(lambda: scraper.executor_queue_depth('compute'), executor='compute')
+metrics.EXECUTOR_QUEUE_DEPTH.set_function(lambda: scraper.executor_queue_depth('parallel'), executor='parallel')
+
+# 單次查詢的最長等待時間（秒），逾時會取消尚未開始的評分工作
+SEARCH_TIMEOUT = float(os.getenv('SEARCH_TIMEOUT', 30))
+# 快速啟動：立即連接 Discord，快照在背景預熱；設為 0 則預熱完成後才連接
+FAST_BOOT = os.getenv('FAST_BOOT', '1') != '0'
+
+# 事件循環延遲監控（設為 0 關閉）
+LOOP_WATCHDOG = os.getenv('LOOP_WATCHDOG', '1') != '0'
+# 持續取樣模式：啟動時開始取樣，每 PROFILE_DUMP_INTERVAL 秒輸出一次 collapsed stack
+SAMPLING_PROFILE = os.getenv('SAMPLING_PROFILE', '0') == '1'
+PROFILE_DUMP_INTERVAL = float(os.getenv('PROFILE_DUMP_INTERVAL', 300))
+# 排行列表每頁筆數與翻頁按鈕的有效秒數
+RANKING_PAGE_SIZE = 10
+RANKING_VIEW_TIMEOUT = 300
+# !range 顯示的最多筆數
+RANGE_RESULT_LIMIT = 15
+# !debug profile 單次取樣的最長秒數
+MAX_PROFILE_SECONDS = 120
+
+_startup_phases = {}
+_active_profiler: Optional[SamplingProfiler] = None
+# 熱門查詢預先建立的嵌入訊息（物品名稱 -> Embed），只對 _prewarmed_version 的快照有效
+_prewarmed_embeds: Dict[str, discord.Embed] = {}
+_prewarmed_version = 0
+
+def mark_startup(phase: str):
+    """記錄從進程啟動到此階段的秒數（每個階段只記錄第一次）"""
+    if phase in _startup_phases:
+        return
+    elapsed = time.perf_counter() - BOOT_STARTED
+    _startup_phases[phase] = elapsed
+    metrics.STARTUP_SECONDS.set(elapsed, phase=phase)
+    print(f"⏱️ 啟動階段 {phase}: {elapsed:.2f} 秒")
+
+mark_startup('imports')
 
 @bot.event
 async def on_ready():
     print(f'{bot.user} 已成功連接到Discord!')
     print(f'機器人ID: {bot.user.id}')
     print('機器人已準備就緒!')
+    mark_startup('ready')
 
 @bot.event
 async def on_message(message):
@@ -56,64 +113,157 @@ async def on_message(message):
     # 處理其他指令
     await bot.process_commands(message)
 
+def format_age(seconds: float) -> str:
+    """把秒數轉為「N 分鐘」等易讀文字"""
+    if seconds < 60:
+        return f"{int(seconds)} 秒"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} 分鐘"
+    return f"{seconds / 3600:.1f} 小時"
+
+def snapshot_notice() -> str:
+    """Embed 頁尾的快照年齡提示；上游無法連線時註明正在顯示最後一次成功的數據"""
+    status = scraper.upstream_status()
+    if status['snapshot_age_seconds'] is None:
+        return ''
+    notice = f"快照更新於 {format_age(status['snapshot_age_seconds'])}前"
+    if status['refresh_failures']:
+        notice += "（⚠️ 上游暫時無法連線，顯示最後一次成功的數據）"
+    return notice
+
+def build_price_embed(result: Dict) -> discord.Embed:
+    """建立價格結果的嵌入訊息（不含頁尾，頁尾依每次查詢填入）"""
+    embed = discord.Embed(
+        title=f"💰 {result['name']} - 價格信息",
+        color=0x00ff00
+    )
+    
+    embed.add_field(
+        name="📦 物品類型",
+        value=result['type'],
+        inline=True
+    )
+    
+    embed.add_field(
+        name="💵 價格區間",
+        value=f"**最低:** {result['price_low']}\n**中位:** {result['price_median']}\n**最高:** {result['price_high']}",
+        inline=True
+    )
+    
+    embed.add_field(
+        name="📈 價格趨勢",
+        value=f"{result['trend']}\n({result['trend_percent']}%)",
+        inline=True
+    )
+    
+    embed.add_field(
+        name="📊 交易量",
+        value=f"{result['volume']} 筆",
+        inline=True
+    )
+    
+    embed.add_field(
+        name="🕒 最後更新",
+        value=result['last_updated'],
+        inline=True
+    )
+    
+    embed.add_field(
+        name="🔗 查看更多",
+        value=f"[點擊查看詳細信息]({scraper.base_url}/price-trends)",
+        inline=False
+    )
+    
+    return embed
+
+def price_embed(result: Dict) -> discord.Embed:
+    """價格結果的嵌入訊息；熱門查詢使用快照更新後預先建立的副本"""
+    if _prewarmed_version == scraper.snapshot_version and result['name'] in _prewarmed_embeds:
+        return _prewarmed_embeds[result['name']].copy()
+    return build_price_embed(result)
+
+async def prewarm_hot_queries(version: int):
+    """快照更新後為熱門查詢預先計算結果並建立嵌入訊息"""
+    global _prewarmed_embeds, _prewarmed_version
+    try:
+        results = await scraper.prewarm_hot_queries()
+    except Exception as e:
+        print(f"⚠️ 熱門查詢預熱失敗: {e}")
+        return
+    if version != scraper.snapshot_version:
+        return
+    _prewarmed_embeds = {result['name']: build_price_embed(result) for result in results}
+    _prewarmed_version = version
+
+def on_snapshot(version, old_items, new_items):
+    """快照監聽器：在背景預熱熱門查詢
+
+    更新任務是在觸發更新的查詢的追蹤中建立的；預熱任務改在空白上下文中建立，
+    其匹配區段與層級才不會混入該查詢的追蹤。
+    """
+    if PREWARM_TOP_N > 0:
+        contextvars.Context().run(asyncio.ensure_future, prewarm_hot_queries(version))
+
+scraper.add_snapshot_listener(on_snapshot)
+
 async def search_and_reply(message, keyword):
-    """搜索並回覆價格信息"""
+    """搜索並回覆價格信息；每個查詢建立一個追蹤，慢查詢會記錄各階段耗時"""
+    with tracing.start_trace('query', keyword=keyword, channel=getattr(message.channel, 'id', None)):
+        created_at = getattr(message, 'created_at', None)
+        if created_at is not None:
+            # 從訊息建立到機器人開始處理（含 Gateway 傳遞與事件排隊）
+            delay = (datetime.now(timezone.utc) - created_at).total_seconds() * 1000
+            tracing.annotate(gateway_delay_ms=round(delay, 1))
+        await _search_and_reply(message, keyword)
+
+async def _search_and_reply(message, keyword):
+    """search_and_reply 的實作"""
     # 發送搜索中的訊息
     searching_embed = discord.Embed(
         title="🔍 搜索中...",
         description=f"正在查詢「{keyword}」的價格信息，請稍候...",
         color=0xffff00
     )
-    temp_message = await message.channel.send(embed=searching_embed)
+    with metrics.DISCORD_SEND_SECONDS.time(operation='send'), tracing.span('discord.send'):
+        temp_message = await message.channel.send(embed=searching_embed)
     
     # 搜索價格
-    result = await scraper.search_item_price(keyword)
+    scraper.record_cache_lookup()
+    timed_out = False
+    try:
+        result = await asyncio.wait_for(scraper.search_item_price(keyword), SEARCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        result = None
+        timed_out = True
+    
+    # 搜索失敗時列出編輯距離最接近的名稱
+    suggestions = []
+    if not result and not timed_out:
+        with tracing.span('suggest'):
+            suggestions = await scraper.suggest_item_names(keyword)
     
-    if result:
-        # 創建結果嵌入訊息
+    embed_start = time.perf_counter()
+    trace_id = tracing.current_trace_id()
+    if timed_out:
         embed = discord.Embed(
-            title=f"💰 {result['name']} - 價格信息",
-            color=0x00ff00
-        )
-        
-        embed.add_field(
-            name="📦 物品類型",
-            value=result['type'],
-            inline=True
-        )
-        
-        embed.add_field(
-            name="💵 價格區間",
-            value=f"**最低:** {result['price_low']}\n**中位:** {result['price_median']}\n**最高:** {result['price_high']}",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="📈 價格趨勢",
-            value=f"{result['trend']}\n({result['trend_percent']}%)",
-            inline=True
+            title="⏱️ 查詢逾時",
+            description=f"查詢「{keyword}」花費的時間過長，請稍後再試。",
+            color=0xff9900
         )
+    elif result:
+        embed = price_embed(result)
+        embed.set_footer(text=f"數據來源: {result['source']} • {snapshot_notice()} • 查詢 ID: {trace_id}")
         
-        embed.add_field(
-            name="📊 交易量",
-            value=f"{result['volume']} 筆",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="🕒 最後更新",
-            value=result['last_updated'],
-            inline=True
-        )
-        
-        embed.add_field(
-            name="🔗 查看更多",
-            value=f"[點擊查看詳細信息]({scraper.base_url}/price-trends)",
-            inline=False
+    elif not scraper.cached_items:
+        # 沒有任何可用的快照（上游無法連線且尚未成功獲取過）
+        status = scraper.upstream_status()
+        retry = f"約 {format_age(status['next_refresh_in_seconds'])}後自動重試。" if status['next_refresh_in_seconds'] else "正在重試中。"
+        embed = discord.Embed(
+            title="⚠️ 暫時無法取得市場數據",
+            description=f"Artale Market 網站暫時無法連線，{retry}請稍後再查詢「{keyword}」。",
+            color=0xff9900
         )
         
-        embed.set_footer(text=f"數據來源: {result['source']}")
-        
     else:
         # 搜索失敗
         embed = discord.Embed(
@@ -127,15 +277,217 @@ async def search_and_reply(message, keyword):
             value="• 檢查道具名稱拼寫\n• 嘗試使用道具的簡稱\n• 稍後再試",
             inline=False
         )
+        
+        if suggestions:
+            embed.add_field(
+                name="🔎 你是不是要找",
+                value="\n".join(f"• `{name}`" for name in suggestions),
+                inline=False
+            )
+    
+    if not result:
+        embed.set_footer(text=f"查詢 ID: {trace_id}")
+    
+    metrics.EMBED_BUILD_SECONDS.observe(time.perf_counter() - embed_start)
+    tracing.record('embed', embed_start)
     
     # 更新訊息
-    await temp_message.edit(embed=embed)
+    with metrics.DISCORD_SEND_SECONDS.time(operation='edit'), tracing.span('discord.edit'):
+        await temp_message.edit(embed=embed)
+    mark_startup('first_response')
 
 @bot.command(name='price', aliases=['p', '價格'])
 async def price_command(ctx, *, keyword):
     """使用指令查詢價格"""
     await search_and_reply(ctx.message, keyword)
 
+RANKING_TITLES = {
+    'popular': "🔥 熱門物品（依交易量）",
+    'trending': "📈 價格變動最大的物品",
+}
+
+def ranking_embed(cursor: RankingCursor, total: int, items: List[Dict], refreshed: bool = False) -> discord.Embed:
+    """排行列表的一頁"""
+    title = RANKING_TITLES.get(cursor.kind) or f"📦 {cursor.item_type}（依交易量）"
+    embed = discord.Embed(title=title, color=0x0099ff)
+    if not items:
+        embed.description = "目前沒有符合的物品。"
+    else:
+        embed.description = "\n".join(
+            f"**{cursor.offset + position}. {item['name']}**\n"
+            f"　中位 {item['price_median']} • {item['volume']} 筆 • {item['trend']} ({item['trend_percent']}%)"
+            for position, item in enumerate(items, start=1)
+        )
+    pages = max(1, -(-total // RANKING_PAGE_SIZE))
+    footer = f"第 {cursor.offset // RANKING_PAGE_SIZE + 1}/{pages} 頁，共 {total} 筆 • {snapshot_notice()}"
+    if refreshed:
+        footer += " • 快照已更新，已改用最新排行"
+    embed.set_footer(text=footer)
+    return embed
+
+class RankingView(discord.ui.View):
+    """排行列表的翻頁按鈕；只有發出指令的使用者可以翻頁"""
+    
+    def __init__(self, author_id: int, cursor: RankingCursor, total: int):
+        super().__init__(timeout=RANKING_VIEW_TIMEOUT)
+        self.author_id = author_id
+        self.cursor = cursor
+        self.total = total
+        self.message = None
+        self._update_buttons()
+    
+    def _update_buttons(self):
+        self.previous_page.disabled = self.cursor.offset <= 0
+        self.next_page.disabled = self.cursor.offset + RANKING_PAGE_SIZE >= self.total
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("只有發出指令的使用者可以翻頁", ephemeral=True)
+            return False
+        return True
+    
+    async def _show(self, interaction: discord.Interaction, offset: int):
+        scraper.record_cache_lookup()
+        requested = self.cursor._replace(offset=offset)
+        self.cursor, self.total, items = await scraper.get_ranking_page(requested, RANKING_PAGE_SIZE)
+        self._update_buttons()
+        embed = ranking_embed(self.cursor, self.total, items, refreshed=self.cursor.version != requested.version)
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="◀ 上一頁", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.cursor.offset - RANKING_PAGE_SIZE)
+    
+    @discord.ui.button(label="下一頁 ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.cursor.offset + RANKING_PAGE_SIZE)
+    
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+async def send_ranking(ctx, kind: str, item_type: Optional[str] = None, page: int = 1):
+    """發送排行列表的第一頁（或指定頁）與翻頁按鈕"""
+    scraper.record_cache_lookup()
+    cursor = RankingCursor(kind, item_type, scraper.snapshot_version, (max(1, page) - 1) * RANKING_PAGE_SIZE)
+    cursor, total, items = await scraper.get_ranking_page(cursor, RANKING_PAGE_SIZE)
+    if not total and not scraper.cached_items:
+        await ctx.send("⚠️ 暫時無法取得市場數據，請稍後再試。")
+        return
+    view = RankingView(ctx.author.id, cursor, total)
+    view.message = await ctx.send(embed=ranking_embed(cursor, total, items), view=view)
+
+@bot.command(name='popular', aliases=['熱門'])
+async def popular_command(ctx, page: int = 1):
+    """依交易量排序的熱門物品"""
+    await send_ranking(ctx, 'popular', page=page)
+
+@bot.command(name='trending', aliases=['趨勢'])
+async def trending_command(ctx, page: int = 1):
+    """價格變動最大的物品"""
+    await send_ranking(ctx, 'trending', page=page)
+
+@bot.command(name='type', aliases=['類型'])
+async def type_command(ctx, *, item_type: Optional[str] = None):
+    """某個類型中依交易量排序的物品；未指定類型時列出所有類型"""
+    await scraper.ensure_snapshot()
+    types = scraper.get_available_types()
+    if item_type not in types:
+        listing = "、".join(f"`{name}`" for name in types) or "（目前沒有數據）"
+        prefix = f"找不到類型「{item_type}」。" if item_type else ""
+        await ctx.send(f"{prefix}可用的類型：{listing}\n用法：`!type 類型名稱`")
+        return
+    await send_ranking(ctx, 'type', item_type)
+
+def format_summary_lines(summary: Dict) -> str:
+    """市場概況的統計行"""
+    lines = [
+        f"物品 {summary['item_count']} 個 • 交易量 {summary['total_volume']} 筆",
+        f"中位價的中位數 {summary['median_price']}",
+        f"📈 上漲 {summary['rising_percent']}% • 📉 下跌 {summary['falling_percent']}%",
+    ]
+    mover = summary['biggest_mover']
+    if mover:
+        lines.append(f"變動最大：{mover['name']} {mover['trend']} ({mover['trend_percent']}%)")
+    return "\n".join(lines)
+
+@bot.command(name='market', aliases=['市場'])
+async def market_command(ctx, *, item_type: Optional[str] = None):
+    """整個市場或某個類型的概況"""
+    scraper.record_cache_lookup()
+    summary = await scraper.get_market_summary(item_type)
+    if summary is None:
+        if not scraper.cached_items:
+            await ctx.send("⚠️ 暫時無法取得市場數據，請稍後再試。")
+        else:
+            listing = "、".join(f"`{name}`" for name in scraper.get_available_types())
+            await ctx.send(f"找不到類型「{item_type}」。可用的類型：{listing}")
+        return
+    
+    if item_type is not None:
+        embed = discord.Embed(title=f"📊 {item_type} 市場概況", description=format_summary_lines(summary), color=0x0099ff)
+    else:
+        embed = discord.Embed(title="📊 市場概況", description=format_summary_lines(summary['market']), color=0x0099ff)
+        for type_summary in summary['types'][:24]:
+            embed.add_field(
+                name=type_summary['type'] or "未分類",
+                value=format_summary_lines(type_summary),
+                inline=False
+            )
+    
+    embed.set_footer(text=snapshot_notice())
+    await ctx.send(embed=embed)
+
+@bot.command(name='range', aliases=['區間'])
+async def range_command(ctx, price_range: str, *, item_type: Optional[str] = None):
+    """中位價在指定區間內的物品，例如 !range 1M-5M 裝備"""
+    try:
+        low, high = parse_price_range(price_range)
+    except ValueError:
+        await ctx.send("用法：`!range 最低-最高 [類型]`，價格可用 K/M 表示，例如 `!range 1M-5M 裝備`、`!range 500K-`")
+        return
+    
+    scraper.record_cache_lookup()
+    total, items = await scraper.get_items_in_price_range(low, high, item_type, limit=RANGE_RESULT_LIMIT)
+    if not scraper.cached_items:
+        await ctx.send("⚠️ 暫時無法取得市場數據，請稍後再試。")
+        return
+    if item_type is not None and item_type not in scraper.get_available_types():
+        listing = "、".join(f"`{name}`" for name in scraper.get_available_types())
+        await ctx.send(f"找不到類型「{item_type}」。可用的類型：{listing}")
+        return
+    
+    if high is None:
+        range_text = f"{scraper._format_price(low)} 以上"
+    else:
+        range_text = f"{scraper._format_price(low)} – {scraper._format_price(high)}"
+    embed = discord.Embed(title=f"💵 {range_text}：{item_type or '所有物品'}", color=0x0099ff)
+    if items:
+        embed.description = "\n".join(
+            f"• **{item['name']}** 中位 {item['price_median']}（{item['price_low']} – {item['price_high']}）• {item['volume']} 筆"
+            for item in items
+        )
+    else:
+        embed.description = "這個價格區間內沒有物品。"
+    
+    footer = f"共 {total} 筆，依中位價由低到高"
+    if total > len(items):
+        footer += f"，顯示前 {len(items)} 筆（可縮小區間或指定類型）"
+    embed.set_footer(text=f"{footer} • {snapshot_notice()}")
+    await ctx.send(embed=embed)
+
+@range_command.error
+async def range_command_error(ctx, error):
+    if isinstance(error, commands.MissingRequiredArgument):
+        await ctx.send("用法：`!range 最低-最高 [類型]`，例如 `!range 1M-5M 裝備`")
+    else:
+        raise error
+
 @bot.command(name='help', aliases=['幫助'])
 async def help_command(ctx):
     """顯示幫助信息"""
@@ -151,6 +503,12 @@ async def help_command(ctx):
         inline=False
     )
     
+    embed.add_field(
+        name="📊 市場列表",
+        value="`!popular` 熱門物品\n`!trending` 價格變動最大的物品\n`!type 類型` 依類型列出物品\n`!market [類型]` 市場概況\n`!range 1M-5M [類型]` 價格區間內的物品",
+        inline=False
+    )
+    
     embed.add_field(
         name="💡 範例",
         value="`@機器人名稱 楓葉`\n`!price 頭盔`\n`!p 藥水`",
@@ -167,6 +525,59 @@ async def help_command(ctx):
     
     await ctx.send(embed=embed)
 
+@bot.group(name='debug', invoke_without_command=True)
+@commands.is_owner()
+async def debug_command(ctx):
+    """擁有者專用的除錯指令"""
+    await ctx.send(f"用法：`!debug profile <秒數>`（最多 {MAX_PROFILE_SECONDS} 秒）")
+
+@debug_command.command(name='profile')
+@commands.is_owner()
+async def debug_profile_command(ctx, seconds: float = 10):
+    """對運行中的機器人取樣指定秒數，回傳 collapsed stack 檔案"""
+    global _active_profiler
+    if _active_profiler is not None:
+        await ctx.send("⚠️ 已有取樣正在進行中")
+        return
+    seconds = max(1.0, min(seconds, MAX_PROFILE_SECONDS))
+    
+    _active_profiler = profiler = SamplingProfiler()
+    try:
+        profiler.start()
+        await ctx.send(f"🔬 開始取樣 {seconds:.0f} 秒...")
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        _active_profiler = None
+    
+    path = profiler.write()
+    print(f"🔬 取樣結果已寫入 {path}")
+    await ctx.send(f"✅ {profiler.summary()}", file=discord.File(path))
+
+@debug_command.error
+@debug_profile_command.error
+async def debug_command_error(ctx, error):
+    if isinstance(error, commands.NotOwner):
+        await ctx.send("⛔ 此指令僅限機器人擁有者使用")
+    elif isinstance(error, commands.BadArgument):
+        await ctx.send("用法：`!debug profile <秒數>`")
+    else:
+        raise error
+
+async def run_continuous_profile():
+    """SAMPLING_PROFILE=1 時持續取樣，定期輸出並重新開始計數"""
+    global _active_profiler
+    while True:
+        _active_profiler = profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            await asyncio.sleep(PROFILE_DUMP_INTERVAL)
+        finally:
+            profiler.stop()
+            _active_profiler = None
+            path = profiler.write()
+            print(f"🔬 取樣結果已寫入 {path}（{profiler.summary()}）")
+
 def run_bot():
     """啟動Discord bot"""
     # 嘗試多種環境變數名稱
@@ -200,59 +611,78 @@ def run_bot():
         return
     
     try:
-        bot.run(token)
+        asyncio.run(serve(token))
     except discord.LoginFailure:
         print("機器人Token無效，請檢查DISCORD_BOT_TOKEN環境變量")
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f"啟動機器人時發生錯誤: {e}")
 
-def start_http_server():
-    """啟動簡單的HTTP服務器供Render使用"""
+async def warm_up():
+    """預熱爬蟲；預熱期間到達的查詢會共用同一次快照更新"""
     try:
-        from http.server import HTTPServer, BaseHTTPRequestHandler
-        import json
-        
-        class HealthHandler(BaseHTTPRequestHandler):
-            def do_GET(self):
-                if self.path == '/':
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    response = {
-                        "status": "running",
-                        "service": "Artale Market Discord Bot",
-                        "bot_user": str(bot.user) if bot.user else "Connecting..."
-                    }
-                    self.wfile.write(json.dumps(response).encode())
-                elif self.path == '/health':
-                    self.send_response(200)
-                    self.send_header('Content-type', 'text/plain')
-                    self.end_headers()
-                    self.wfile.write(b'OK')
-                else:
-                    self.send_response(404)
-                    self.end_headers()
-            
-            def log_message(self, format, *args):
-                # 靜默HTTP日誌
-                pass
-        
-        port = int(os.environ.get('PORT', 10000))
-        server = HTTPServer(('0.0.0.0', port), HealthHandler)
-        print(f"🌐 HTTP服務器啟動在端口 {port}")
-        server.serve_forever()
+        if await scraper.warm_up():
+            mark_startup('snapshot')
+        else:
+            print("⚠️ 預熱時無法獲取快照，將在第一次查詢時重試")
     except Exception as e:
+        print(f"⚠️ 預熱失敗: {e}")
+
+async def serve(token: str):
+    """在同一個事件循環上運行HTTP服務器與Discord bot"""
+    loop = asyncio.get_running_loop()
+    
+    # 收到終止信號時優雅關閉（Windows 不支援 add_signal_handler）
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, lambda: asyncio.ensure_future(bot.close()))
+        except (NotImplementedError, RuntimeError):
+            pass
+    
+    port = int(os.environ.get('PORT', 10000))
+    http_server = WebServer(bot, scraper, port=port)
+    try:
+        await http_server.start()
+        print(f"🌐 HTTP服務器啟動在端口 {port}")
+    except OSError as e:
         print(f"❌ HTTP服務器錯誤: {e}")
+        http_server = None
+    
+    profile_task = asyncio.create_task(run_continuous_profile()) if SAMPLING_PROFILE else None
+    
+    watchdog = None
+    if LOOP_WATCHDOG:
+        watchdog = LoopWatchdog()
+        watchdog.register_metrics()
+        watchdog.start()
+    
+    # 依上游發布週期在背景輪詢快照
+    refresh_task = asyncio.create_task(scraper.run_refresh_schedule())
+    
+    warm_up_task = None
+    if FAST_BOOT:
+        warm_up_task = asyncio.create_task(warm_up())
+    else:
+        await warm_up()
+    
+    try:
+        async with bot:
+            await bot.start(token)
+    finally:
+        if warm_up_task is not None:
+            warm_up_task.cancel()
+        refresh_task.cancel()
+        await asyncio.gather(refresh_task, return_exceptions=True)
+        if profile_task is not None:
+            profile_task.cancel()
+            await asyncio.gather(profile_task, return_exceptions=True)
+        if watchdog is not None:
+            await watchdog.stop()
+        if http_server is not None:
+            await http_server.stop()
+        await scraper.close()
+        print("👋 機器人已關閉")
 
 if __name__ == "__main__":
-    # 檢查是否在Render環境中
-    if os.getenv('RENDER'):
-        print("🚀 檢測到Render環境，啟動HTTP服務器...")
-        # 在背景執行Discord bot
-        bot_thread = threading.Thread(target=run_bot, daemon=True)
-        bot_thread.start()
-        # 主線程運行HTTP服務器
-        start_http_server()
-    else:
-        # 本地開發環境，直接運行bot
-        run_bot() 
\ No newline at end of file
+    run_bot()
@@ -0,0 +1,65 @@
+"""
+市場概況：每個快照一次分組計算各類型的物品數、總交易量、中位價的中位數、
+上漲/下跌物品比例與變動最大的物品
+"""
+
+import statistics
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
+
+from item_record import ItemRecord
+
+
+class TypeSummary:
+    """單一類型（item_type 為 None 時為整個市場）的彙總統計"""
+
+    __slots__ = ('item_type', 'item_count', 'total_volume', 'median_of_medians',
+                 'rising', 'falling', 'mover')
+
+    def __init__(self, item_type: Optional[str]):
+        self.item_type = item_type
+        self.item_count = 0
+        self.total_volume = 0
+        self.median_of_medians = 0
+        self.rising = 0
+        self.falling = 0
+        self.mover: Optional[ItemRecord] = None  # 價格變化絕對值最大的物品
+
+    @property
+    def rising_share(self) -> float:
+        return self.rising / self.item_count if self.item_count else 0.0
+
+    @property
+    def falling_share(self) -> float:
+        return self.falling / self.item_count if self.item_count else 0.0
+
+
+_volume = attrgetter('volume')
+_median = attrgetter('median')
+_change = attrgetter('recent_change_percent')
+
+
+def _summarize(item_type: Optional[str], items: List[ItemRecord]) -> TypeSummary:
+    summary = TypeSummary(item_type)
+    if not items:
+        return summary
+    changes = list(map(_change, items))
+    summary.item_count = len(items)
+    summary.total_volume = sum(map(_volume, items))
+    summary.median_of_medians = int(statistics.median(map(_median, items)))
+    summary.rising = len(list(filter((0.0).__lt__, changes)))
+    summary.falling = len(list(filter((0.0).__gt__, changes)))
+    highest, lowest = max(changes), min(changes)
+    summary.mover = items[changes.index(highest if abs(highest) >= abs(lowest) else lowest)]
+    return summary
+
+
+def summarize_market(items: List[ItemRecord]) -> Tuple[TypeSummary, Dict[str, TypeSummary]]:
+    """依類型分組一次，各組以內建函數彙總，返回 (整個市場, {類型: 彙總})"""
+    groups: Dict[str, List[ItemRecord]] = {}
+    for item in items:
+        group = groups.get(item.item_type)
+        if group is None:
+            group = groups[item.item_type] = []
+        group.append(item)
+    return _summarize(None, items), {item_type: _summarize(item_type, group) for item_type, group in groups.items()}
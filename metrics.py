@@ -0,0 +1,320 @@
+"""
+簡易 Prometheus 指標收集（文字格式，不依賴 prometheus_client）
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# 預設延遲直方圖區間（秒），涵蓋搜索的毫秒級到 Selenium 的分鐘級
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value: float) -> str:
+    """格式化指標數值"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = '') -> str:
+    """格式化標籤字串"""
+    parts = []
+    for name, value in zip(labelnames, labelvalues):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Metric:
+    """指標基底類別"""
+    type_name = 'untyped'
+    # HELP / TYPE 使用的名稱後綴（0.0.4 文字格式中必須與樣本名稱一致）
+    family_suffix = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要標籤 {self.labelnames}，收到 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        family = self.name + self.family_suffix
+        lines = [
+            f"# HELP {family} {self.documentation}",
+            f"# TYPE {family} {self.type_name}",
+        ]
+        for suffix, labelvalues, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labelvalues, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+    type_name = 'counter'
+    family_suffix = '_total'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('_total', key, '', value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可減的量表，支援以回調函數即時計算"""
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], Optional[float]]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], Optional[float]], **labels):
+        """設置回調，於輸出指標時才計算數值（回傳 None 則略過）"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                value = function()
+            except Exception:
+                value = None
+            if value is not None:
+                values[key] = value
+        return [('', key, '', value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """延遲直方圖"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每組標籤: [各區間計數..., 總和, 總數]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, **labels) -> '_Timer':
+        """計時上下文管理器"""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        samples = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                samples.append(('_bucket', key, f'le="{_format_value(bound)}"', count))
+            samples.append(('_bucket', key, 'le="+Inf"', state[-1]))
+            samples.append(('_sum', key, '', state[-2]))
+            samples.append(('_count', key, '', state[-1]))
+        return samples
+
+
+class _Timer:
+    """Histogram.time() 的實作"""
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    """指標登錄表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指標已存在: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """輸出 Prometheus 文字格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _process_rss_bytes() -> Optional[float]:
+    """獲取目前進程的常駐記憶體（RSS）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以位元組為單位，Linux 以 KB 為單位
+        return rss if sys.platform == 'darwin' else rss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+# 機器人使用的指標
+UPSTREAM_FETCH_SECONDS = REGISTRY.register(Histogram(
+    'artale_upstream_fetch_seconds',
+    '上游數據獲取耗時（依策略與結果）',
+    ('strategy', 'outcome'),
+))
+SEARCH_SECONDS = REGISTRY.register(Histogram(
+    'artale_search_seconds',
+    'search_item_price 耗時',
+))
+EMBED_BUILD_SECONDS = REGISTRY.register(Histogram(
+    'artale_embed_build_seconds',
+    '建立 Discord Embed 耗時',
+))
+DISCORD_SEND_SECONDS = REGISTRY.register(Histogram(
+    'artale_discord_send_seconds',
+    'Discord 訊息發送/編輯耗時',
+    ('operation',),
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'artale_cache_requests',
+    '快取查詢次數（命中/未命中）',
+    ('result',),
+))
+NEGATIVE_CACHE_REQUESTS = REGISTRY.register(Counter(
+    'artale_negative_cache_requests',
+    '未命中查詢的處理方式（hit=負面快取命中、prefilter=字元預篩排除、stored=完整匹配後記住）',
+    ('result',),
+))
+PREWARM_REQUESTS = REGISTRY.register(Counter(
+    'artale_prewarm_requests',
+    '熱門查詢預熱（stored=快照更新後預先計算的結果數、hit=由預熱結果直接回覆的查詢）',
+    ('result',),
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    'artale_cache_hit_ratio',
+    '快取命中率',
+))
+SNAPSHOT_AGE_SECONDS = REGISTRY.register(Gauge(
+    'artale_snapshot_age_seconds',
+    '目前快照距上次成功更新的秒數',
+))
+UPSTREAM_REFRESH_FAILURES = REGISTRY.register(Gauge(
+    'artale_upstream_refresh_failures',
+    '上游快照連續更新失敗次數（0 表示最後一次更新成功）',
+))
+UPSTREAM_POLLS = REGISTRY.register(Counter(
+    'artale_upstream_polls',
+    '上游輪詢次數（changed=上游已發布新快照、unchanged=快照未改變、failed=更新失敗）',
+    ('result',),
+))
+NEXT_POLL_SECONDS = REGISTRY.register(Gauge(
+    'artale_next_poll_seconds',
+    '距離下一次排定輪詢上游的秒數',
+))
+EXECUTOR_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'artale_executor_queue_depth',
+    '線程池等待中的工作數量',
+    ('executor',),
+))
+LOOP_LAG_SECONDS = REGISTRY.register(Histogram(
+    'artale_event_loop_lag_seconds',
+    '事件循環延遲（計時協程實際醒來時間與預期的差）',
+))
+LOOP_LAG_QUANTILE = REGISTRY.register(Gauge(
+    'artale_event_loop_lag_quantile_seconds',
+    '最近事件循環延遲的百分位數',
+    ('quantile',),
+))
+LOOP_STALLS = REGISTRY.register(Counter(
+    'artale_event_loop_stalls',
+    '事件循環延遲超過門檻的次數',
+))
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    'artale_startup_seconds',
+    '從進程啟動到各階段完成的秒數（imports/ready/snapshot/first_response）',
+    ('phase',),
+))
+PROCESS_RSS_BYTES = REGISTRY.register(Gauge(
+    'process_resident_memory_bytes',
+    '進程常駐記憶體（位元組）',
+))
+
+
+def _cache_hit_ratio() -> Optional[float]:
+    hits = CACHE_REQUESTS.get(result='hit')
+    misses = CACHE_REQUESTS.get(result='miss')
+    total = hits + misses
+    return hits / total if total else None
+
+
+CACHE_HIT_RATIO.set_function(_cache_hit_ratio)
+PROCESS_RSS_BYTES.set_function(_process_rss_bytes)
+
+
+def render() -> str:
+    """輸出所有指標"""
+    return REGISTRY.render()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+artale-market.org 的本地模擬服務器，提供 / 與 /api/price-snapshots，
+可設定數據量、延遲、Cloudflare 挑戰頁、格式錯誤的 JSON 及非 JSON 回應
+
+用法:
+    python mock_market_server.py --port 8081 --items 5000 --latency 0.5 --fail-first 2
+    ARTALE_MARKET_URL=http://127.0.0.1:8081 python main.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+from collections import Counter
+
+from aiohttp import web
+
+from synthetic_catalog import generate_items
+
+CHALLENGE_PAGE = b"""<!DOCTYPE html><html><head><title>Just a moment...</title></head>
+<body><h1>Checking your browser before accessing artale-market.org.</h1>
+<p>This process is automatic. Your browser will redirect shortly.</p></body></html>"""
+
+HOME_PAGE = b"""<!DOCTYPE html><html><head><title>Artale Market</title></head>
+<body><h1>Artale Market (mock)</h1></body></html>"""
+
+# 首頁模式
+HOME_MODES = ('ok', 'challenge', 'challenge_200')
+# API 模式
+API_MODES = ('ok', 'challenge', 'malformed', 'non_json', 'error', 'empty')
+
+
+class MockMarketServer:
+    """可設定行為的模擬上游
+
+    fail_first: 前 N 個請求（不分路徑）一律返回 403 挑戰頁，之後依模式回應，
+    用於測量重試後恢復所需的時間。challenge_rate 為每個請求隨機被挑戰的機率。
+    """
+
+    def __init__(self, items: int = 1000, latency: float = 0.0, jitter: float = 0.0,
+                 home_mode: str = 'ok', api_mode: str = 'ok', fail_first: int = 0,
+                 challenge_rate: float = 0.0, seed: int = 42):
+        if home_mode not in HOME_MODES:
+            raise ValueError(f"未知的首頁模式: {home_mode}")
+        if api_mode not in API_MODES:
+            raise ValueError(f"未知的 API 模式: {api_mode}")
+        self.latency = latency
+        self.jitter = jitter
+        self.home_mode = home_mode
+        self.api_mode = api_mode
+        self.fail_first = fail_first
+        self.challenge_rate = challenge_rate
+        self.rng = random.Random(seed)
+        self.request_counts = Counter()
+        self.total_requests = 0
+        self.runner = None
+        self.port = None
+
+        snapshots = generate_items(items, seed=seed)
+        self.payload = json.dumps({'snapshots': snapshots}, ensure_ascii=False).encode()
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get('/', self.handle_home),
+            web.get('/api/price-snapshots', self.handle_snapshots),
+        ])
+
+    async def _before_response(self, path: str) -> bool:
+        """記錄請求並模擬延遲，返回是否應回應挑戰頁"""
+        self.request_counts[path] += 1
+        self.total_requests += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self.total_requests <= self.fail_first or self.rng.random() < self.challenge_rate
+
+    def _challenge(self, status: int = 403) -> web.Response:
+        return web.Response(body=CHALLENGE_PAGE, status=status, content_type='text/html')
+
+    async def handle_home(self, request: web.Request) -> web.Response:
+        if await self._before_response('/') or self.home_mode == 'challenge':
+            return self._challenge()
+        if self.home_mode == 'challenge_200':
+            return self._challenge(status=200)
+        return web.Response(body=HOME_PAGE, content_type='text/html')
+
+    async def handle_snapshots(self, request: web.Request) -> web.Response:
+        if await self._before_response('/api/price-snapshots') or self.api_mode == 'challenge':
+            return self._challenge()
+        if self.api_mode == 'malformed':
+            # 截斷的 JSON
+            return web.Response(body=self.payload[:len(self.payload) // 2], content_type='application/json')
+        if self.api_mode == 'non_json':
+            return web.Response(body=HOME_PAGE, content_type='text/html')
+        if self.api_mode == 'error':
+            return web.Response(text='Internal Server Error', status=500)
+        if self.api_mode == 'empty':
+            return web.json_response({'snapshots': []})
+        return web.Response(body=self.payload, content_type='application/json')
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        """啟動服務器；port 為 0 時自動選擇可用端口"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        self.port = sock.getsockname()[1]
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.SockSite(self.runner, sock).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Artale Market 模擬服務器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--items', type=int, default=1000, help='快照物品數量')
+    parser.add_argument('--latency', type=float, default=0.0, help='每個請求的固定延遲（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='額外隨機延遲上限（秒）')
+    parser.add_argument('--home-mode', choices=HOME_MODES, default='ok')
+    parser.add_argument('--api-mode', choices=API_MODES, default='ok')
+    parser.add_argument('--fail-first', type=int, default=0, help='前 N 個請求返回挑戰頁')
+    parser.add_argument('--challenge-rate', type=float, default=0.0, help='隨機返回挑戰頁的機率')
+    args = parser.parse_args()
+
+    server = MockMarketServer(
+        items=args.items, latency=args.latency, jitter=args.jitter,
+        home_mode=args.home_mode, api_mode=args.api_mode,
+        fail_first=args.fail_first, challenge_rate=args.challenge_rate
+    )
+    await server.start(args.host, args.port)
+    print(f"🧪 模擬服務器運行於 http://{args.host}:{server.port}（{len(server.payload):,} 位元組快照）")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,74 @@
+"""
+價格區間索引：建立快照時為每個類型（與整個市場）依中位價排序，
+區間查詢以二分搜尋找出邊界，只切取需要的部分
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
+
+from item_record import ItemRecord
+
+# 與 ArtaleMarketScraper._format_price 的輸出對應：1M、1M500K、500K、12K345、999，另接受 1.5M 與千分位逗號
+_PRICE_PATTERN = re.compile(r'^(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)k)?(\d+)?$')
+
+
+def parse_price(text: str) -> int:
+    """把 K/M 表示法的價格轉為整數，無法解析時引發 ValueError"""
+    normalized = text.strip().lower().replace(',', '')
+    match = _PRICE_PATTERN.match(normalized)
+    if not normalized or not match:
+        raise ValueError(f"無法解析價格: {text}")
+    millions, thousands, units = match.groups()
+    price = float(millions or 0) * 1000000 + float(thousands or 0) * 1000 + int(units or 0)
+    return int(round(price))
+
+
+def parse_price_range(text: str) -> Tuple[int, Optional[int]]:
+    """解析「最低-最高」價格區間（亦接受 ~），省略最高價表示沒有上限"""
+    parts = re.split(r'[-~～]', text.strip(), maxsplit=1)
+    if len(parts) != 2:
+        raise ValueError(f"價格區間格式應為 最低-最高: {text}")
+    low = parse_price(parts[0]) if parts[0].strip() else 0
+    high = parse_price(parts[1]) if parts[1].strip() else None
+    if high is not None and high < low:
+        low, high = high, low
+    return low, high
+
+
+_median = attrgetter('median')
+
+
+class _SortedPrices:
+    """依中位價排序的物品與對應的價格陣列"""
+
+    __slots__ = ('prices', 'items')
+
+    def __init__(self, items: List[ItemRecord]):
+        self.items = sorted(items, key=_median)
+        self.prices = list(map(_median, self.items))
+
+    def bounds(self, low: int, high: Optional[int]) -> Tuple[int, int]:
+        start = bisect_left(self.prices, low)
+        end = len(self.prices) if high is None else bisect_right(self.prices, high)
+        return start, max(start, end)
+
+
+class PriceRangeIndex:
+    """每個類型（None 為整個市場）一組依中位價排序的陣列"""
+
+    def __init__(self, items: List[ItemRecord]):
+        groups: Dict[Optional[str], List[ItemRecord]] = {None: items}
+        for item in items:
+            groups.setdefault(item.item_type, []).append(item)
+        self._sorted = {item_type: _SortedPrices(group) for item_type, group in groups.items()}
+
+    def search(self, low: int, high: Optional[int], item_type: Optional[str] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[int, List[ItemRecord]]:
+        """返回 (中位價在區間內的物品總數, 依中位價由低到高的一段物品)"""
+        sorted_prices = self._sorted.get(item_type)
+        if sorted_prices is None:
+            return 0, []
+        start, end = sorted_prices.bounds(low, high)
+        return end - start, sorted_prices.items[start + offset:min(end, start + offset + limit)]
@@ -1,112 +1,198 @@
 import asyncio
-import json
+import functools
+import importlib
+import math
+import os
 import re
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import time
 import logging
-from fuzzywuzzy import fuzz
-import requests
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import random
+import metrics
+import tracing
+from fuzzy_scoring import ParallelFuzzyScorer, fuzzy_best_match, process_context
+from item_record import ItemRecord, snapshot_fingerprint
+from market_summary import TypeSummary, summarize_market
+from price_index import PriceRangeIndex
+from query_stats import QueryStats
+from refresh_scheduler import RefreshScheduler, snapshot_marker
+from search_index import EMPTY_INDEX, SearchIndex, load_aliases
+from snapshot_rankings import RankingCursor, SnapshotRankings
+from snapshot_stream import CHUNK_SIZE, SnapshotParseError, iter_text_chunks, parse_snapshot_stream
 
-# 設置日誌
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 目錄達到此大小時，模糊評分改在計算線程池中執行，避免阻塞事件循環
+COMPUTE_OFFLOAD_MIN_ITEMS = int(os.getenv('COMPUTE_OFFLOAD_MIN_ITEMS', 2000))
+# 目錄達到此大小時，模糊評分分段交給進程池平行執行
+PARALLEL_FUZZY_MIN_ITEMS = int(os.getenv('PARALLEL_FUZZY_MIN_ITEMS', 50000))
+PARALLEL_FUZZY_WORKERS = int(os.getenv('PARALLEL_FUZZY_WORKERS', os.cpu_count() or 2))
+# 更新失敗後的退避秒數：每次連續失敗加倍，直到上限
+REFRESH_BACKOFF_BASE = float(os.getenv('REFRESH_BACKOFF_BASE', 60))
+REFRESH_BACKOFF_MAX = float(os.getenv('REFRESH_BACKOFF_MAX', 1800))
+# 快照更新後預先計算結果的熱門查詢數（0 表示不預熱）
+PREWARM_TOP_N = int(os.getenv('PREWARM_TOP_N', 50))
+# 社群暱稱別名表（{"別名": "物品名稱"}）
+ITEM_ALIASES_PATH = os.getenv('ITEM_ALIASES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'item_aliases.json'))
+
+
+def _create_compute_executor(kind: str, workers: int) -> Executor:
+    """建立計算用執行器（thread 或 process）"""
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+    if kind != 'thread':
+        logger.warning(f"未知的 COMPUTE_EXECUTOR: {kind}，改用 thread")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='artale-compute')
+
+
 class ArtaleMarketScraper:
-    def __init__(self):
-        self.base_url = "https://artale-market.org"
-        self.api_url = "https://artale-market.org/api/price-snapshots"
+    def __init__(self, base_url: Optional[str] = None, delay_scale: float = 1.0,
+                 fetch_workers: Optional[int] = None, compute_workers: Optional[int] = None,
+                 compute_executor: Optional[str] = None):
+        # ARTALE_MARKET_URL 可指向本地模擬服務器（見 mock_market_server.py）
+        self.base_url = (base_url or os.getenv('ARTALE_MARKET_URL') or "https://artale-market.org").rstrip('/')
+        self.api_url = f"{self.base_url}/api/price-snapshots"
+        self.delay_scale = delay_scale  # 重試/等待時間的倍率，壓測時可縮短
         self.cached_items = []
         self.cache_timestamp = 0
-        self.cache_duration = 300  # 5分鐘緩存
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.scheduler = RefreshScheduler()  # 依上游發布週期決定輪詢時間
+        self.next_poll_at = 0.0  # 下一次輪詢上游的時間；之前的查詢直接使用快照
+        self.query_stats = QueryStats()  # 查詢（小寫）的滾動頻率統計
+        # 熱門查詢預先計算的結果（小寫查詢 -> 結果）；模糊與部分匹配依原始空白分詞，
+        # 正規化後相同的查詢仍可能匹配到不同物品，因此不以正規化名稱為鍵
+        self._warm_results = {}
+        self._warm_version = 0
+        self._market = None  # (快照版本, 整個市場, {類型: 彙總})，第一次使用時計算
+        self.snapshot_version = 0  # 每次安裝新快照遞增
+        self._index = EMPTY_INDEX  # 目前快照的搜索索引
+        self._price_index = PriceRangeIndex([])  # 目前快照的價格區間索引
+        self._rankings = SnapshotRankings([])  # 目前快照的熱門、趨勢與各類型排序列表
+        self._fingerprint: Optional[int] = None  # 目前快照內容的指紋，用於判斷輪詢結果是否有變
+        self.aliases = load_aliases(ITEM_ALIASES_PATH)
+        self._snapshot_listeners = []
+        self._refresh_task = None
+        self.refresh_failures = 0  # 連續更新失敗次數
+        self.next_refresh_at = 0.0  # 退避期間內不再嘗試更新
+        
+        # I/O 線程池執行獲取策略（Selenium 可能佔用一分鐘），計算池執行模糊評分
+        fetch_workers = fetch_workers or int(os.getenv('FETCH_WORKERS', 2))
+        compute_workers = compute_workers or int(os.getenv('COMPUTE_WORKERS', 2))
+        self.compute_executor_kind = compute_executor or os.getenv('COMPUTE_EXECUTOR', 'thread')
+        self.compute_offload_min_items = COMPUTE_OFFLOAD_MIN_ITEMS
+        self.fetch_executor = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='artale-fetch')
+        self.compute_executor = _create_compute_executor(self.compute_executor_kind, compute_workers)
+        self.parallel_scorer = ParallelFuzzyScorer(PARALLEL_FUZZY_WORKERS, PARALLEL_FUZZY_MIN_ITEMS)
         
-    def _try_requests_with_retry(self) -> List[Dict]:
+    def _sleep(self, seconds: float):
+        """依 delay_scale 等待"""
+        with tracing.span('sleep', seconds=round(seconds, 2)):
+            time.sleep(seconds * self.delay_scale)
+    
+    def _try_requests_with_retry(self) -> List[ItemRecord]:
         """嘗試使用 requests 獲取數據，包含重試機制"""
+        # 延遲載入：只有第一次獲取數據時才需要 requests
+        import requests
+        
         max_retries = 3
         
         for attempt in range(max_retries):
-            try:
-                logger.info(f"requests 嘗試 {attempt + 1}/{max_retries}...")
-                
-                # 構建更完整的請求頭
-                headers = {
-                    'User-Agent': random.choice([
-                        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                    ]),
-                    'Accept': 'application/json, text/plain, */*',
-                    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Cache-Control': 'max-age=0',
-                }
-                
-                session = requests.Session()
-                session.headers.update(headers)
-                
-                # 先訪問主頁建立會話
-                logger.info("訪問主頁建立會話...")
-                main_response = session.get(self.base_url, timeout=30)
-                
-                # 檢查是否被 Cloudflare 阻擋
-                if main_response.status_code == 403 or "just a moment" in main_response.text.lower():
-                    logger.warning(f"嘗試 {attempt + 1}: 主頁被 Cloudflare 阻擋")
-                    time.sleep(5 * (attempt + 1))  # 遞增延遲
-                    continue
-                
-                # 等待一段時間模擬人類行為
-                time.sleep(random.uniform(2, 5))
-                
-                # 請求 API 數據
-                logger.info("請求 API 數據...")
-                api_response = session.get(f"{self.api_url}?date=latest", timeout=30)
-                
-                if api_response.status_code == 200:
-                    try:
-                        # 檢查響應內容
-                        content_type = api_response.headers.get('content-type', '').lower()
-                        if 'application/json' in content_type or api_response.text.strip().startswith('{'):
-                            data = api_response.json()
-                            items = data.get('snapshots', [])
+            with tracing.span('fetch.attempt', strategy='requests', attempt=attempt + 1) as attempt_span:
+                try:
+                    logger.info(f"requests 嘗試 {attempt + 1}/{max_retries}...")
+                    
+                    # 構建更完整的請求頭
+                    headers = {
+                        'User-Agent': random.choice([
+                            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                        ]),
+                        'Accept': 'application/json, text/plain, */*',
+                        'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+                        'Accept-Encoding': 'gzip, deflate, br',
+                        'DNT': '1',
+                        'Connection': 'keep-alive',
+                        'Upgrade-Insecure-Requests': '1',
+                        'Sec-Fetch-Dest': 'document',
+                        'Sec-Fetch-Mode': 'navigate',
+                        'Sec-Fetch-Site': 'none',
+                        'Cache-Control': 'max-age=0',
+                    }
+                    
+                    session = requests.Session()
+                    session.headers.update(headers)
+                    
+                    # 先訪問主頁建立會話
+                    logger.info("訪問主頁建立會話...")
+                    with tracing.span('http.home') as http_span:
+                        main_response = session.get(self.base_url, timeout=30)
+                        http_span.set(status=main_response.status_code)
+                    
+                    # 檢查是否被 Cloudflare 阻擋
+                    if main_response.status_code == 403 or "just a moment" in main_response.text.lower():
+                        logger.warning(f"嘗試 {attempt + 1}: 主頁被 Cloudflare 阻擋")
+                        attempt_span.set(outcome='home_blocked')
+                        self._sleep(5 * (attempt + 1))  # 遞增延遲
+                        continue
+                    
+                    # 等待一段時間模擬人類行為
+                    self._sleep(random.uniform(2, 5))
+                    
+                    # 請求 API 數據
+                    logger.info("請求 API 數據...")
+                    with tracing.span('http.api') as http_span:
+                        api_response = session.get(f"{self.api_url}?date=latest", timeout=30, stream=True)
+                        http_span.set(status=api_response.status_code)
+                    
+                    if api_response.status_code == 200:
+                        try:
+                            # 逐塊解析響應內容，非 JSON 內容會在第一塊就被拒絕
+                            with tracing.span('parse'):
+                                items = parse_snapshot_stream(api_response.iter_content(chunk_size=CHUNK_SIZE))
                             if items:
                                 logger.info(f"requests 成功獲取 {len(items)} 個物品數據")
+                                attempt_span.set(outcome='success', items=len(items))
                                 return items
-                        else:
-                            logger.warning(f"嘗試 {attempt + 1}: API 返回非 JSON 內容")
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"嘗試 {attempt + 1}: JSON 解析失敗: {e}")
-                else:
-                    logger.warning(f"嘗試 {attempt + 1}: API 請求失敗，狀態碼: {api_response.status_code}")
-                
-                # 在重試前等待
-                if attempt < max_retries - 1:
-                    wait_time = 10 * (attempt + 1)
-                    logger.info(f"等待 {wait_time} 秒後重試...")
-                    time.sleep(wait_time)
+                            attempt_span.set(outcome='empty')
+                        except SnapshotParseError as e:
+                            content_type = api_response.headers.get('content-type', '').lower()
+                            if 'application/json' in content_type:
+                                logger.warning(f"嘗試 {attempt + 1}: JSON 解析失敗: {e}")
+                                attempt_span.set(outcome='parse_error')
+                            else:
+                                logger.warning(f"嘗試 {attempt + 1}: API 返回非 JSON 內容")
+                                attempt_span.set(outcome='non_json')
+                        finally:
+                            api_response.close()
+                    else:
+                        api_response.close()
+                        logger.warning(f"嘗試 {attempt + 1}: API 請求失敗，狀態碼: {api_response.status_code}")
+                        attempt_span.set(outcome=f'http_{api_response.status_code}')
                     
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"嘗試 {attempt + 1}: 請求異常: {e}")
-                if attempt < max_retries - 1:
-                    wait_time = 5 * (attempt + 1)
-                    time.sleep(wait_time)
-            except Exception as e:
-                logger.error(f"嘗試 {attempt + 1}: 未知錯誤: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(5)
+                    # 在重試前等待
+                    if attempt < max_retries - 1:
+                        wait_time = 10 * (attempt + 1)
+                        logger.info(f"等待 {wait_time} 秒後重試...")
+                        self._sleep(wait_time)
+                        
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"嘗試 {attempt + 1}: 請求異常: {e}")
+                    attempt_span.set(outcome='request_error')
+                    if attempt < max_retries - 1:
+                        wait_time = 5 * (attempt + 1)
+                        self._sleep(wait_time)
+                except Exception as e:
+                    logger.error(f"嘗試 {attempt + 1}: 未知錯誤: {e}")
+                    attempt_span.set(outcome='error')
+                    if attempt < max_retries - 1:
+                        self._sleep(5)
         
         logger.error("所有 requests 嘗試都失敗了")
         return []
     
-    def _try_selenium_fallback(self) -> List[Dict]:
+    def _try_selenium_fallback(self) -> List[ItemRecord]:
         """使用 Selenium 作為備用方案（如果 Selenium 可用）"""
         try:
             # 只有在 Selenium 可用時才嘗試
@@ -135,7 +221,7 @@ class ArtaleMarketScraper:
                 
                 # 訪問 API
                 driver.get(f"{self.api_url}?date=latest")
-                time.sleep(10)  # 等待頁面加載
+                self._sleep(10)  # 等待頁面加載
                 
                 # 嘗試提取數據
                 try:
@@ -143,8 +229,7 @@ class ArtaleMarketScraper:
                     for pre in pre_elements:
                         text = pre.text.strip()
                         if text and text.startswith('{'):
-                            data = json.loads(text)
-                            items = data.get('snapshots', [])
+                            items = parse_snapshot_stream(iter_text_chunks(text))
                             if items:
                                 logger.info(f"Selenium 成功獲取 {len(items)} 個物品數據")
                                 return items
@@ -163,71 +248,203 @@ class ArtaleMarketScraper:
             logger.error(f"Selenium 備用方案失敗: {e}")
             return []
     
-    def _fetch_data_with_strategies(self) -> List[Dict]:
+    def _run_strategy(self, strategy: str, fetch) -> List[ItemRecord]:
+        """執行單一獲取策略並記錄耗時"""
+        start = time.perf_counter()
+        with tracing.span(f'fetch.{strategy}') as strategy_span:
+            items = fetch()
+            strategy_span.set(outcome='success' if items else 'failure')
+        metrics.UPSTREAM_FETCH_SECONDS.observe(
+            time.perf_counter() - start,
+            strategy=strategy,
+            outcome='success' if items else 'failure'
+        )
+        return items
+    
+    def _fetch_data_with_strategies(self) -> List[ItemRecord]:
         """使用多種策略獲取數據"""
         # 策略1: 使用 requests（主要方法）
-        items = self._try_requests_with_retry()
+        items = self._run_strategy('requests', self._try_requests_with_retry)
         
         # 策略2: 如果失敗且 Selenium 可用，使用 Selenium
         if not items:
             logger.info("requests 方法失敗，嘗試 Selenium...")
-            items = self._try_selenium_fallback()
+            items = self._run_strategy('selenium', self._try_selenium_fallback)
         
-        # 策略3: 使用模擬數據（緊急備用）
         if not items:
-            logger.warning("所有數據獲取方法都失敗，使用模擬數據")
-            items = self._get_mock_data()
+            logger.error("所有數據獲取方法都失敗")
         
         return items
     
-    def _get_mock_data(self) -> List[Dict]:
-        """返回一些模擬數據作為最後備用"""
-        return [
-            {
-                'item_name': '楓葉',
-                'item_type': '其他',
-                'low': 100,
-                'median': 150,
-                'high': 200,
-                'volume': 50,
-                'recent_change_percent': 5.0,
-                'snapshot_date': '2024-01-01'
-            },
-            {
-                'item_name': '藥水',
-                'item_type': '消耗品',
-                'low': 500,
-                'median': 750,
-                'high': 1000,
-                'volume': 100,
-                'recent_change_percent': -2.0,
-                'snapshot_date': '2024-01-01'
-            }
-        ]
+    def _fetch_and_index(self) -> Tuple[List[ItemRecord], Optional[int], Optional[SearchIndex],
+                                        Optional[PriceRangeIndex], Optional[SnapshotRankings]]:
+        """獲取數據並在同一個 I/O 線程中建立搜索索引、價格區間索引與排行，不佔用事件循環
+
+        返回 (物品, 內容指紋, 搜索索引, 價格區間索引, 排行)；內容與目前快照相同時不建立索引。
+        """
+        items = self._fetch_data_with_strategies()
+        if not items:
+            return items, None, None, None, None
+        fingerprint = snapshot_fingerprint(items)
+        if fingerprint == self._fingerprint:
+            return items, fingerprint, None, None, None
+        with tracing.span('index', items=len(items)):
+            index = SearchIndex(items, self.aliases)
+            # 大目錄的名稱檔也在此寫入，安裝快照時進程池直接改用
+            self.parallel_scorer.prepare(index.names)
+            return items, fingerprint, index, PriceRangeIndex(items), SnapshotRankings(items)
     
-    async def _fetch_all_items(self) -> List[Dict]:
-        """獲取所有物品數據"""
+    async def _fetch_all_items(self) -> List[ItemRecord]:
+        """獲取所有物品數據
+
+        快照過期時在背景更新並繼續提供最後一次成功的快照；只有尚無快照時才等待更新。
+        上游更新失敗後進入退避，退避期間不會再嘗試，也不會讓查詢等待。
+        """
         try:
             # 檢查緩存
             current_time = time.time()
-            if self.cached_items and (current_time - self.cache_timestamp) < self.cache_duration:
-                return self.cached_items
-            
-            # 在線程池中運行數據獲取
-            loop = asyncio.get_event_loop()
-            items = await loop.run_in_executor(self.executor, self._fetch_data_with_strategies)
+            if self.cached_items and current_time < self.next_poll_at:
+                with tracing.span('cache', result='hit'):
+                    return self.cached_items
             
-            # 更新緩存
-            if items:
-                self.cached_items = items
-                self.cache_timestamp = current_time
-                logger.info(f"成功獲取並緩存 {len(items)} 個物品數據")
-            
-            return items
+            backing_off = current_time < self.next_refresh_at
+            with tracing.span('cache', result='stale' if self.cached_items else 'miss',
+                              shared=self._refresh_task is not None, backoff=backing_off):
+                refresh_task = self._start_refresh(current_time)
+                if self.cached_items or refresh_task is None:
+                    return self.cached_items
+                return await asyncio.shield(refresh_task)
                         
         except Exception as e:
             logger.error(f"獲取數據失敗: {e}")
-            return []
+            return self.cached_items
+    
+    def _start_refresh(self, current_time: float) -> Optional[asyncio.Future]:
+        """開始（或共用進行中的）更新；退避期間返回 None
+
+        同時到達的請求共用同一次刷新；單一請求逾時被取消不會中斷刷新本身。
+        """
+        if self._refresh_task is None and current_time >= self.next_refresh_at:
+            self._refresh_task = asyncio.ensure_future(self._refresh(current_time))
+        return self._refresh_task
+    
+    async def run_refresh_schedule(self):
+        """背景依排程輪詢上游，讓新快照在發布後盡快安裝，不必等待查詢觸發"""
+        while True:
+            await asyncio.sleep(max(0.0, self.next_poll_at - time.time()))
+            refresh_task = self._start_refresh(time.time())
+            if refresh_task is not None:
+                await asyncio.shield(refresh_task)
+    
+    def record_cache_lookup(self):
+        """每個使用者請求記錄一次快取查詢：快照在輪詢間隔內為命中，否則為未命中
+
+        內部呼叫（匹配層級、建議、預熱）不另外計算，避免膨脹命中率。
+        """
+        hit = bool(self.cached_items) and time.time() < self.next_poll_at
+        metrics.CACHE_REQUESTS.inc(result='hit' if hit else 'miss')
+    
+    async def _refresh(self, current_time: float) -> List[ItemRecord]:
+        """在 I/O 線程池中獲取數據並更新緩存；失敗時保留舊快照並設定退避"""
+        try:
+            loop = asyncio.get_running_loop()
+            items, fingerprint, index, price_index, rankings = await loop.run_in_executor(
+                self.fetch_executor, tracing.wrap(self._fetch_and_index, queue='fetch'))
+        except Exception as e:
+            logger.error(f"更新快照時發生錯誤: {e}")
+            items, fingerprint, index, price_index, rankings = [], None, None, None, None
+        finally:
+            self._refresh_task = None
+        
+        if not items:
+            metrics.UPSTREAM_POLLS.inc(result='failed')
+            self._record_refresh_failure()
+            return self.cached_items
+        
+        # 更新緩存並排定下一次輪詢
+        now = time.time()
+        changed = self.scheduler.observe(snapshot_marker(items), now)
+        metrics.UPSTREAM_POLLS.inc(result='changed' if changed else 'unchanged')
+        self.refresh_failures = 0
+        self.next_refresh_at = 0.0
+        self.next_poll_at = now + self.scheduler.next_delay(now)
+        if fingerprint == self._fingerprint and self.cached_items:
+            # 內容沒有變化：只更新時間，保留版本號與所有依版本快取的結果（ETag、排行、負面快取等）
+            self.cache_timestamp = current_time
+            logger.info(f"快照內容未改變，{self.next_poll_at - now:.0f} 秒後再次輪詢")
+            return self.cached_items
+        self._install_snapshot(items, current_time, index, price_index, fingerprint, rankings)
+        logger.info(f"成功獲取並緩存 {len(items)} 個物品數據，{self.next_poll_at - now:.0f} 秒後再次輪詢")
+        return items
+    
+    def _record_refresh_failure(self):
+        """記錄一次更新失敗並計算下一次可嘗試的時間"""
+        self.refresh_failures += 1
+        backoff = min(REFRESH_BACKOFF_BASE * 2 ** (self.refresh_failures - 1), REFRESH_BACKOFF_MAX)
+        self.next_refresh_at = self.next_poll_at = time.time() + backoff
+        age = self.snapshot_age()
+        serving = f"繼續提供 {age / 60:.0f} 分鐘前的快照" if age is not None else "目前沒有可用的快照"
+        logger.warning(f"上游連續 {self.refresh_failures} 次更新失敗，{backoff:.0f} 秒後再試；{serving}")
+    
+    def is_stale(self) -> bool:
+        """快照可能已過時：排定的輪詢尚未完成，或上游無法連線"""
+        return bool(self.cached_items) and (self.refresh_failures > 0 or time.time() >= self.next_poll_at)
+    
+    def upstream_status(self) -> Dict:
+        """快照與上游狀態，用於 Embed、API 與健康檢查"""
+        age = self.snapshot_age()
+        next_poll_in = self.next_poll_at - time.time()
+        return {
+            'has_snapshot': bool(self.cached_items),
+            'snapshot_age_seconds': round(age) if age is not None else None,
+            'stale': self.is_stale(),
+            'refresh_failures': self.refresh_failures,
+            'next_refresh_in_seconds': max(0, round(next_poll_in)) if math.isfinite(next_poll_in) else None,
+            **self.scheduler.status(),
+        }
+    
+    def add_snapshot_listener(self, listener):
+        """註冊快照監聽器，每次安裝新快照時以 (版本, 舊物品, 新物品) 呼叫"""
+        self._snapshot_listeners.append(listener)
+    
+    def _install_snapshot(self, items: List[ItemRecord], timestamp: float, index: Optional[SearchIndex] = None,
+                          price_index: Optional[PriceRangeIndex] = None, fingerprint: Optional[int] = None,
+                          rankings: Optional[SnapshotRankings] = None):
+        """安裝新快照並遞增版本號；index / price_index / fingerprint / rankings 為預先計算的結果（未提供則在此計算）"""
+        old_items = self.cached_items
+        self._index = index or SearchIndex(items, self.aliases)
+        self._price_index = price_index or PriceRangeIndex(items)
+        self._rankings = rankings or SnapshotRankings(items)
+        self._fingerprint = fingerprint if fingerprint is not None else snapshot_fingerprint(items)
+        self.cached_items = items
+        self.cache_timestamp = timestamp
+        self.snapshot_version += 1
+        self.parallel_scorer.load(self._index.names, self.snapshot_version)
+        
+        for listener in self._snapshot_listeners:
+            try:
+                listener(self.snapshot_version, old_items, items)
+            except Exception as e:
+                logger.error(f"快照監聽器執行失敗: {e}")
+    
+    async def warm_up(self) -> int:
+        """預熱：在 I/O 線程中載入模糊評分模組並獲取第一個快照，返回快照版本（無數據時為 0）"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.fetch_executor, importlib.import_module, 'fuzzywuzzy.fuzz')
+        return await self.ensure_snapshot()
+    
+    async def ensure_snapshot(self) -> int:
+        """確保快照可用（必要時更新），返回目前快照版本；無數據時返回 0"""
+        items = await self._fetch_all_items()
+        return self.snapshot_version if items else 0
+    
+    async def get_item(self, item_name: str) -> Optional[Dict]:
+        """依完整名稱查詢物品（不區分大小寫，亦接受正規化名稱與別名）"""
+        items = await self._fetch_all_items()
+        if not items:
+            return None
+        item = self._index.lookup(item_name)
+        return self._format_item_data(item) if item else None
     
     def _format_price(self, price: int) -> str:
         """格式化價格顯示"""
@@ -251,87 +468,265 @@ class ArtaleMarketScraper:
         else:
             return "穩定 ➡️"
     
-    def _format_item_data(self, item: Dict) -> Dict:
+    def _format_item_data(self, item: ItemRecord) -> Dict:
         """格式化物品數據"""
         try:
             return {
-                'name': item.get('item_name', '未知物品'),
-                'type': item.get('item_type', '未知類型'),
-                'price_low': self._format_price(item.get('low', 0)),
-                'price_median': self._format_price(item.get('median', 0)),
-                'price_high': self._format_price(item.get('high', 0)),
-                'price_raw_median': item.get('median', 0),
-                'volume': item.get('volume', 0),
-                'trend': self._get_trend_text(item.get('recent_change_percent', 0)),
-                'trend_percent': round(item.get('recent_change_percent', 0), 2),
-                'last_updated': item.get('snapshot_date', '未知'),
+                'name': item.item_name or '未知物品',
+                'type': item.item_type or '未知類型',
+                'price_low': self._format_price(item.low),
+                'price_median': self._format_price(item.median),
+                'price_high': self._format_price(item.high),
+                'price_raw_median': item.median,
+                'volume': item.volume,
+                'trend': self._get_trend_text(item.recent_change_percent),
+                'trend_percent': round(item.recent_change_percent, 2),
+                'last_updated': item.snapshot_date or '未知',
                 'source': 'artale-market.org'
             }
         except Exception as e:
             logger.error(f"格式化物品數據失敗: {e}")
             return None
     
+    def snapshot_age(self) -> Optional[float]:
+        """目前快照的年齡（秒），尚無快照時返回 None"""
+        if not self.cache_timestamp:
+            return None
+        return time.time() - self.cache_timestamp
+    
+    def executor_queue_depth(self, name: str = 'fetch') -> int:
+        """執行器中等待執行的工作數量（進程池包含執行中的工作）"""
+        if name == 'parallel':
+            return self.parallel_scorer.queue_depth()
+        executor = self.fetch_executor if name == 'fetch' else self.compute_executor
+        if isinstance(executor, ProcessPoolExecutor):
+            return len(executor._pending_work_items)
+        return executor._work_queue.qsize()
+    
+    async def _fuzzy_best_matches(self, keywords: List[str], names: List[str], version: int) -> List[Tuple[int, int]]:
+        """為多個小寫關鍵字找出模糊匹配分數最高的物品索引
+
+        超大目錄分段交給進程池平行評分；較大目錄在計算池中執行；小目錄直接在事件循環上計算。
+        請求被取消時尚未開始的評分工作也會取消。
+        """
+        if self.parallel_scorer.ready_for(version):
+            return await self.parallel_scorer.best_matches(keywords)
+        if len(names) >= self.compute_offload_min_items:
+            loop = asyncio.get_running_loop()
+            # 追蹤上下文無法傳給進程池，只在線程池中記錄排隊等待
+            if self.compute_executor_kind == 'thread':
+                calls = [tracing.wrap(fuzzy_best_match, keyword, names, queue='compute') for keyword in keywords]
+            else:
+                calls = [functools.partial(fuzzy_best_match, keyword, names) for keyword in keywords]
+            return list(await asyncio.gather(*[loop.run_in_executor(self.compute_executor, call) for call in calls]))
+        return [fuzzy_best_match(keyword, names) for keyword in keywords]
+    
+    def _partial_word_match(self, keyword_lower: str, items: List[ItemRecord], names: List[str]) -> Optional[ItemRecord]:
+        """部分關鍵詞匹配：返回第一個包含任一關鍵詞的物品"""
+        words = keyword_lower.split()
+        for index, item_name in enumerate(names):
+            if any(word in item_name for word in words):
+                return items[index]
+        return None
+    
+    async def search_item_prices(self, keywords: List[str]) -> List[Optional[Dict]]:
+        """批量搜索，模糊匹配階段一次評分所有未精確命中的關鍵字"""
+        items = await self._fetch_all_items()
+        if not items:
+            return [None] * len(keywords)
+        index = self._index
+        names = index.names
+        version = self.snapshot_version
+        
+        results: List[Optional[ItemRecord]] = []
+        pending = []
+        for position, keyword in enumerate(keywords):
+            keyword_lower = keyword.lower()
+            item = index.lookup(keyword)
+            if item is None and not self._rejects(index, keyword):
+                item = index.typo_match(keyword)
+                if item is None:
+                    pending.append((position, keyword_lower))
+            results.append(item)
+        
+        if pending:
+            matches = await self._fuzzy_best_matches([keyword for _, keyword in pending], names, version)
+            for (position, keyword_lower), (best_index, _) in zip(pending, matches):
+                if best_index >= 0:
+                    results[position] = items[best_index]
+                else:
+                    results[position] = self._partial_word_match(keyword_lower, items, names)
+                    if results[position] is None:
+                        self._remember_miss(index, keyword_lower)
+        
+        return [self._format_item_data(item) if item else None for item in results]
+    
     async def search_item_price(self, keyword: str) -> Optional[Dict]:
         """搜索道具價格信息"""
+        with metrics.SEARCH_SECONDS.time(), tracing.span('search'):
+            return await self._search_item_price(keyword)
+    
+    async def _search_item_price(self, keyword: str) -> Optional[Dict]:
+        """search_item_price 的實作"""
         try:
-            items = await self._fetch_all_items()
-            if not items:
-                return None
-            
-            # 精確匹配
-            for item in items:
-                if keyword.lower() == item.get('item_name', '').lower():
-                    return self._format_item_data(item)
-            
-            # 模糊匹配
-            best_match = None
-            best_score = 0
-            
-            for item in items:
-                item_name = item.get('item_name', '')
-                score = fuzz.partial_ratio(keyword.lower(), item_name.lower())
-                
-                if keyword.lower() in item_name.lower():
-                    score += 20
-                
-                if score > best_score and score >= 60:
-                    best_score = score
-                    best_match = item
-            
-            if best_match:
-                logger.info(f"找到匹配物品: {best_match.get('item_name')} (匹配度: {best_score})")
-                return self._format_item_data(best_match)
+            key = keyword.lower()
+            if key.strip():
+                self.query_stats.add(key, keyword)
+                result = self._warm_result(key)
+                if result is not None:
+                    return result
             
-            # 部分關鍵詞匹配
-            for item in items:
-                item_name = item.get('item_name', '').lower()
-                if any(word in item_name for word in keyword.lower().split()):
-                    logger.info(f"找到部分匹配物品: {item.get('item_name')}")
-                    return self._format_item_data(item)
-            
-            logger.info(f"未找到匹配的物品: {keyword}")
-            return None
+            item, _ = await self.match_item(keyword)
+            if not item:
+                return None
+            with tracing.span('format'):
+                return self._format_item_data(item)
             
         except Exception as e:
             logger.error(f"搜索價格時發生錯誤: {e}")
             return None
     
-    async def get_popular_items(self, limit: int = 10) -> List[Dict]:
-        """獲取熱門物品（按交易量排序）"""
+    def _warm_result(self, key: str) -> Optional[Dict]:
+        """返回熱門查詢在目前快照預先計算的結果；輪詢到期時交由一般路徑觸發更新"""
+        if self._warm_version != self.snapshot_version or time.time() >= self.next_poll_at:
+            return None
+        result = self._warm_results.get(key)
+        if result is not None:
+            metrics.PREWARM_REQUESTS.inc(result='hit')
+            tracing.annotate(tier='prewarmed')
+        return result
+    
+    async def prewarm_hot_queries(self, limit: int = PREWARM_TOP_N) -> List[Dict]:
+        """為目前快照預先計算最熱門查詢的結果，返回找到的結果（快照在途中更換時放棄）"""
+        version = self.snapshot_version
+        warm = {}
+        for key, raw, _ in self.query_stats.top(limit):
+            item, _ = await self.match_item(raw)
+            if self.snapshot_version != version:
+                return []
+            if item:
+                warm[key] = self._format_item_data(item)
+            # 精確匹配不會讓出事件循環，每個查詢之後讓其他工作先執行
+            await asyncio.sleep(0)
+        self._warm_results = warm
+        self._warm_version = version
+        metrics.PREWARM_REQUESTS.inc(len(warm), result='stored')
+        return list(warm.values())
+    
+    async def match_item(self, keyword: str) -> Tuple[Optional[ItemRecord], str]:
+        """依序嘗試各匹配層級，返回 (物品, 層級)
+
+        層級為 exact、typo、fuzzy、partial；未命中為 miss，沒有快照為 no_data。
+        """
+        item, tier = await self._match_item(keyword)
+        tracing.annotate(tier=tier)
+        return item, tier
+    
+    async def _match_item(self, keyword: str) -> Tuple[Optional[ItemRecord], str]:
+        """match_item 的實作"""
+        items = await self._fetch_all_items()
+        if not items:
+            return None, 'no_data'
+        index = self._index
+        names = index.names
+        version = self.snapshot_version
+        keyword_lower = keyword.lower()
+        
+        # 精確匹配（含正規化名稱與別名）
+        with tracing.span('match.exact'):
+            item = index.lookup(keyword)
+        if item:
+            return item, 'exact'
+        
+        # 已知未命中或與所有名稱沒有共同字元的查詢
+        with tracing.span('match.negative_cache'):
+            rejected = self._rejects(index, keyword)
+        if rejected:
+            return None, 'miss'
+        
+        # 錯字修正（BK-tree 編輯距離查詢）
+        with tracing.span('match.typo'):
+            item = index.typo_match(keyword)
+        if item:
+            logger.info(f"找到錯字修正物品: {item.item_name}")
+            return item, 'typo'
+        
+        # 模糊匹配
+        with tracing.span('match.fuzzy'):
+            best_index, best_score = (await self._fuzzy_best_matches([keyword_lower], names, version))[0]
+        if best_index >= 0:
+            best_match = items[best_index]
+            logger.info(f"找到匹配物品: {best_match.item_name} (匹配度: {best_score})")
+            return best_match, 'fuzzy'
+        
+        # 部分關鍵詞匹配
+        with tracing.span('match.partial'):
+            item = self._partial_word_match(keyword_lower, items, names)
+        if item:
+            logger.info(f"找到部分匹配物品: {item.item_name}")
+            return item, 'partial'
+        
+        logger.info(f"未找到匹配的物品: {keyword}")
+        self._remember_miss(index, keyword)
+        return None, 'miss'
+    
+    def _rejects(self, index: SearchIndex, keyword: str) -> bool:
+        """負面快取命中或字元預篩判定必然無結果時返回 True"""
+        if index.is_known_miss(keyword):
+            metrics.NEGATIVE_CACHE_REQUESTS.inc(result='hit')
+            return True
+        if not index.may_match(keyword):
+            metrics.NEGATIVE_CACHE_REQUESTS.inc(result='prefilter')
+            index.remember_miss(keyword)
+            return True
+        return False
+    
+    def _remember_miss(self, index: SearchIndex, keyword: str):
+        """記住走完所有匹配層級仍未命中的查詢（隨快照索引一起失效）"""
+        metrics.NEGATIVE_CACHE_REQUESTS.inc(result='stored')
+        index.remember_miss(keyword)
+    
+    async def suggest_item_names(self, keyword: str, limit: int = 5) -> List[str]:
+        """搜索失敗時的「你是不是要找」建議名稱"""
         try:
             items = await self._fetch_all_items()
             if not items:
                 return []
-            
-            sorted_items = sorted(items, key=lambda x: x.get('volume', 0), reverse=True)
-            
-            popular_items = []
-            for item in sorted_items[:limit]:
-                formatted_item = self._format_item_data(item)
-                if formatted_item:
-                    popular_items.append(formatted_item)
-            
-            return popular_items
+            index = self._index
+            # 索引無法高效地傳給進程池，只在線程池中執行
+            if len(index.names) >= self.compute_offload_min_items and self.compute_executor_kind == 'thread':
+                loop = asyncio.get_running_loop()
+                suggestions = await loop.run_in_executor(self.compute_executor, index.suggest, keyword, limit)
+            else:
+                suggestions = index.suggest(keyword, limit)
+            return [item.item_name for item in suggestions]
+        except Exception as e:
+            logger.error(f"產生搜索建議時發生錯誤: {e}")
+            return []
+    
+    async def get_ranking_page(self, cursor: RankingCursor, size: int) -> Tuple[RankingCursor, int, List[Dict]]:
+        """返回 (實際使用的游標, 總筆數, 該頁物品)
+
+        游標建立後快照已更新時，改用目前快照並保留位移；位移超出範圍時移到最後一頁。
+        """
+        items = await self._fetch_all_items()
+        if not items:
+            return cursor, 0, []
+        rankings = self._rankings
+        total = rankings.total(cursor.kind, cursor.item_type)
+        last_page = max(0, (total - 1) // size * size)
+        cursor = cursor._replace(version=self.snapshot_version, offset=max(0, min(cursor.offset, last_page)))
+        return cursor, total, [self._format_item_data(item) for item in rankings.page(cursor, size)]
+    
+    async def _ranked_items(self, kind: str, limit: int, item_type: Optional[str] = None) -> List[Dict]:
+        cursor = RankingCursor(kind, item_type, self.snapshot_version, 0)
+        _, _, page = await self.get_ranking_page(cursor, limit)
+        return page
+    
+    async def get_popular_items(self, limit: int = 10) -> List[Dict]:
+        """獲取熱門物品（按交易量排序）"""
+        try:
+            return await self._ranked_items('popular', limit)
             
         except Exception as e:
             logger.error(f"獲取熱門物品失敗: {e}")
@@ -340,22 +735,7 @@ class ArtaleMarketScraper:
     async def get_trending_items(self, limit: int = 10) -> List[Dict]:
         """獲取趨勢物品（按價格變化排序）"""
         try:
-            items = await self._fetch_all_items()
-            if not items:
-                return []
-            
-            sorted_items = sorted(items, 
-                                key=lambda x: abs(x.get('recent_change_percent', 0)), 
-                                reverse=True)
-            
-            trending_items = []
-            for item in sorted_items[:limit]:
-                if abs(item.get('recent_change_percent', 0)) >= 2:
-                    formatted_item = self._format_item_data(item)
-                    if formatted_item:
-                        trending_items.append(formatted_item)
-            
-            return trending_items[:limit]
+            return await self._ranked_items('trending', limit)
             
         except Exception as e:
             logger.error(f"獲取趨勢物品失敗: {e}")
@@ -363,46 +743,109 @@ class ArtaleMarketScraper:
     
     async def get_items_by_type(self, item_type: str, limit: int = 20) -> List[Dict]:
         """根據物品類型獲取物品"""
+        try:
+            return await self._ranked_items('type', limit, item_type)
+            
+        except Exception as e:
+            logger.error(f"根據類型獲取物品失敗: {e}")
+            return []
+    
+    def _format_summary(self, summary: TypeSummary) -> Dict:
+        mover = summary.mover
+        return {
+            'type': summary.item_type,
+            'item_count': summary.item_count,
+            'total_volume': summary.total_volume,
+            'median_price': self._format_price(summary.median_of_medians),
+            'rising_percent': round(summary.rising_share * 100, 1),
+            'falling_percent': round(summary.falling_share * 100, 1),
+            'biggest_mover': {
+                'name': mover.item_name,
+                'trend': self._get_trend_text(mover.recent_change_percent),
+                'trend_percent': round(mover.recent_change_percent, 2),
+            } if mover else None,
+        }
+    
+    async def get_market_summary(self, item_type: Optional[str] = None) -> Optional[Dict]:
+        """市場概況；指定類型時只返回該類型，未指定時返回整個市場與各類型（每個快照只計算一次）"""
         try:
             items = await self._fetch_all_items()
             if not items:
-                return []
+                return None
             
-            filtered_items = [item for item in items 
-                            if item.get('item_type', '') == item_type]
+            version = self.snapshot_version
+            market = self._market
+            if market is None or market[0] != version:
+                if self.compute_executor_kind == 'thread' and len(items) >= self.compute_offload_min_items:
+                    # 大型目錄的分組排序移到計算線程池，避免阻塞事件循環
+                    loop = asyncio.get_running_loop()
+                    summaries = await loop.run_in_executor(self.compute_executor, summarize_market, items)
+                else:
+                    summaries = summarize_market(items)
+                market = (version, *summaries)
+                if self.snapshot_version == version:
+                    self._market = market
+            _, overall, by_type = market
             
-            sorted_items = sorted(filtered_items, 
-                                key=lambda x: x.get('volume', 0), reverse=True)
+            if item_type is not None:
+                summary = by_type.get(item_type)
+                return self._format_summary(summary) if summary else None
+            return {
+                'market': self._format_summary(overall),
+                'types': [self._format_summary(by_type[name]) for name in sorted(by_type)],
+            }
             
-            result_items = []
-            for item in sorted_items[:limit]:
-                formatted_item = self._format_item_data(item)
-                if formatted_item:
-                    result_items.append(formatted_item)
+        except Exception as e:
+            logger.error(f"計算市場概況失敗: {e}")
+            return None
+    
+    async def get_items_in_price_range(self, low: int, high: Optional[int], item_type: Optional[str] = None,
+                                       limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """中位價在 [low, high] 內的物品（high 為 None 表示沒有上限），依價格由低到高，返回 (總數, 該段物品)"""
+        try:
+            items = await self._fetch_all_items()
+            if not items:
+                return 0, []
             
-            return result_items
+            total, matched = self._price_index.search(low, high, item_type, limit=limit, offset=offset)
+            return total, [self._format_item_data(item) for item in matched]
             
         except Exception as e:
-            logger.error(f"根據類型獲取物品失敗: {e}")
-            return []
+            logger.error(f"查詢價格區間失敗: {e}")
+            return 0, []
     
     def get_available_types(self) -> List[str]:
         """獲取可用的物品類型"""
         if not self.cached_items:
             return []
         
-        types = set()
-        for item in self.cached_items:
-            item_type = item.get('item_type')
-            if item_type:
-                types.add(item_type)
-        
-        return sorted(list(types))
+        return sorted(item_type for item_type in self._rankings.by_type if item_type)
+    
+    async def close(self):
+        """關閉爬蟲：清空緩存並停止線程池，取消尚未開始的工作"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        self.cached_items = []
+        self.cache_timestamp = 0
+        self.next_poll_at = 0.0
+        self._index = EMPTY_INDEX
+        self._price_index = PriceRangeIndex([])
+        self._fingerprint = None
+        self._rankings = SnapshotRankings([])
+        self._market = None
+        self.fetch_executor.shutdown(wait=False, cancel_futures=True)
+        self.compute_executor.shutdown(wait=False, cancel_futures=True)
+        self.parallel_scorer.close()
     
     def __del__(self):
         """析構函數"""
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=True)
+        # 可能在線程池自身的線程中被回收，不能等待線程結束
+        for name in ('fetch_executor', 'compute_executor'):
+            executor = getattr(self, name, None)
+            if executor is not None:
+                executor.shutdown(wait=False)
+        if hasattr(self, 'parallel_scorer'):
+            self.parallel_scorer.close()
 
 # 全域實例
 _scraper_instance = None
@@ -446,10 +889,10 @@ async def test_scraper():
         if items:
             print("\n前3個物品:")
             for i, item in enumerate(items[:3]):
-                name = item.get('item_name', '未知')
-                item_type = item.get('item_type', '未知')
-                median = item.get('median', 0)
-                volume = item.get('volume', 0)
+                name = item.item_name
+                item_type = item.item_type
+                median = item.median
+                volume = item.volume
                 print(f"{i+1}. {name} ({item_type}) - 價格: {median:,}, 交易量: {volume}")
             
             # 測試搜索
@@ -462,4 +905,5 @@ async def test_scraper():
         print(f"測試失敗: {e}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(test_scraper()) 
\ No newline at end of file
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+啟動載入時間報告：以 python -X importtime 在全新進程中載入模組，
+列出累計耗時與自身耗時最高的模組
+
+用法:
+    python profile_imports.py
+    python profile_imports.py --module price_scraper --top 15
+"""
+
+import argparse
+import subprocess
+import sys
+
+from bench_common import save_results
+
+
+def profile(module: str):
+    """返回 [(模組, 自身微秒, 累計微秒, 深度)] 與總耗時"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"載入 {module} 失敗:\n{completed.stderr}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    return rows, total_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模組載入時間報告')
+    parser.add_argument('--module', default='main', help='要載入的模組')
+    parser.add_argument('--top', type=int, default=20, help='列出的模組數')
+    parser.add_argument('--output', default='bench_imports.json', help='結果 JSON 路徑')
+    args = parser.parse_args()
+
+    rows, total_us = profile(args.module)
+    print(f"📦 import {args.module}: {total_us / 1000:.1f} ms（含直譯器啟動，{len(rows)} 個模組）")
+
+    print("\n累計耗時最高的頂層套件:")
+    top_level = sorted((row for row in rows if row[3] <= 1), key=lambda row: -row[2])
+    for name, _, cumulative, _ in top_level[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+    print("\n自身耗時最高的模組:")
+    for name, self_us, _, _ in sorted(rows, key=lambda row: -row[1])[:args.top]:
+        print(f"  {self_us / 1000:>8.1f} ms  {name}")
+
+    results = [{'module': name, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative / 1000, 'depth': depth}
+               for name, self_us, cumulative, depth in rows]
+    save_results(args.output, 'imports', results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
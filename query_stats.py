@@ -0,0 +1,75 @@
+"""
+查詢頻率統計：以 count-min sketch 估計每個（轉為小寫的）查詢的次數，
+並保留估計次數最高的候選查詢，記憶體用量與查詢種類數無關
+
+計數定期減半，讓統計反映最近的查詢而不是所有歷史。
+"""
+
+from array import array
+from typing import Dict, List, Tuple
+
+# sketch 的行數與每行的計數器數
+SKETCH_DEPTH = 4
+SKETCH_WIDTH = 4096
+# 每累積此數量的查詢，所有計數減半
+DECAY_EVERY = 20000
+
+
+class QueryStats:
+    """滾動的查詢頻率 sketch 與熱門查詢候選"""
+
+    def __init__(self, capacity: int = 200, depth: int = SKETCH_DEPTH, width: int = SKETCH_WIDTH,
+                 decay_every: int = DECAY_EVERY):
+        self.capacity = capacity
+        self.depth = depth
+        self.width = width
+        self.decay_every = decay_every
+        self.rows = [array('L', bytes(array('L').itemsize * width)) for _ in range(depth)]
+        self.total = 0
+        # 熱門候選：小寫查詢 -> [估計次數, 最近一次的原始查詢]
+        self.heavy: Dict[str, list] = {}
+
+    def _slots(self, key: str):
+        return [(row, hash((seed, key)) % self.width) for seed, row in enumerate(self.rows)]
+
+    def add(self, key: str, raw: str) -> int:
+        """記錄一次查詢，返回該查詢的估計次數"""
+        slots = self._slots(key)
+        estimate = None
+        for row, slot in slots:
+            row[slot] += 1
+            estimate = row[slot] if estimate is None else min(estimate, row[slot])
+
+        entry = self.heavy.get(key)
+        if entry is not None:
+            entry[0] = estimate
+            entry[1] = raw
+        elif len(self.heavy) < self.capacity:
+            self.heavy[key] = [estimate, raw]
+        else:
+            coldest = min(self.heavy, key=lambda k: self.heavy[k][0])
+            if estimate > self.heavy[coldest][0]:
+                del self.heavy[coldest]
+                self.heavy[key] = [estimate, raw]
+
+        self.total += 1
+        if self.total % self.decay_every == 0:
+            self._decay()
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[slot] for row, slot in self._slots(key))
+
+    def _decay(self):
+        for row in self.rows:
+            for slot in range(self.width):
+                row[slot] >>= 1
+        for key in list(self.heavy):
+            self.heavy[key][0] >>= 1
+            if not self.heavy[key][0]:
+                del self.heavy[key]
+
+    def top(self, n: int) -> List[Tuple[str, str, int]]:
+        """估計次數最高的 n 個查詢 [(小寫查詢, 原始查詢, 估計次數)]"""
+        ranked = sorted(self.heavy.items(), key=lambda entry: -entry[1][0])[:n]
+        return [(key, raw, count) for key, (count, raw) in ranked]
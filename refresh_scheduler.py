@@ -0,0 +1,156 @@
+"""
+快照更新排程：記錄上游 snapshot_date 實際改變的時間，學習發布週期，
+在預期發布時間前後密集輪詢、其餘時間稀疏輪詢，並加入隨機抖動，
+同時降低快照延遲與對上游（及 Cloudflare）的請求數
+
+尚未觀察到兩次改變前以固定間隔輪詢。
+"""
+
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 尚未學到發布週期時的輪詢間隔（秒）
+REFRESH_DEFAULT_INTERVAL = float(os.getenv('REFRESH_DEFAULT_INTERVAL', 300))
+# 預期發布時間前後的輪詢間隔（秒）
+REFRESH_DENSE_INTERVAL = float(os.getenv('REFRESH_DENSE_INTERVAL', 60))
+# 遠離預期發布時間時的輪詢間隔上限（秒）
+REFRESH_SPARSE_INTERVAL = float(os.getenv('REFRESH_SPARSE_INTERVAL', 1800))
+# 預期發布時間前後密集輪詢的最小半徑（秒）；週期不穩定時自動放寬
+REFRESH_DENSE_WINDOW = float(os.getenv('REFRESH_DENSE_WINDOW', 600))
+# 輪詢間隔的隨機抖動比例
+REFRESH_JITTER = float(os.getenv('REFRESH_JITTER', 0.1))
+# 設置後把觀察到的發布時間存到此檔案，重新啟動後不必重新學習
+REFRESH_SCHEDULE_PATH = os.getenv('REFRESH_SCHEDULE_PATH')
+# 用來估計週期的最近發布次數
+CHANGE_HISTORY = 20
+
+
+def snapshot_marker(items: Iterable) -> Optional[str]:
+    """快照的發布標記：所有物品中最新的 snapshot_date"""
+    return max((item.snapshot_date for item in items if item.snapshot_date), default=None)
+
+
+class RefreshScheduler:
+    """依觀察到的上游發布時間決定下一次輪詢的時間"""
+
+    def __init__(self, path: Optional[str] = REFRESH_SCHEDULE_PATH,
+                 default_interval: float = REFRESH_DEFAULT_INTERVAL,
+                 dense_interval: float = REFRESH_DENSE_INTERVAL,
+                 sparse_interval: float = REFRESH_SPARSE_INTERVAL,
+                 dense_window: float = REFRESH_DENSE_WINDOW,
+                 jitter: float = REFRESH_JITTER):
+        self.path = path
+        self.default_interval = default_interval
+        self.dense_interval = dense_interval
+        self.sparse_interval = sparse_interval
+        self.dense_window = dense_window
+        self.jitter = jitter
+        self.marker: Optional[str] = None
+        self.changes = deque(maxlen=CHANGE_HISTORY)  # 估計的發布時間（epoch 秒）
+        self.last_poll_at: Optional[float] = None
+        self._load()
+
+    def observe(self, marker: Optional[str], polled_at: float) -> bool:
+        """記錄一次成功的輪詢，返回上游是否已發布新快照
+
+        發布時間估計為上一次看到舊標記與這次輪詢的中點，密集輪詢時誤差很小。
+        """
+        changed = self.marker is not None and marker != self.marker
+        if changed and self.last_poll_at is not None:
+            # 重新啟動後的第一次輪詢無法得知標記何時改變，不列入週期估計
+            self.changes.append((self.last_poll_at + polled_at) / 2)
+        if changed:
+            logger.info(f"上游發布新快照 {self.marker} → {marker}（{self.describe()}）")
+        if marker != self.marker:
+            self.marker = marker
+            self._save()
+        self.last_poll_at = polled_at
+        return changed
+
+    @property
+    def period(self) -> Optional[float]:
+        """發布週期（最近發布間隔的中位數）；觀察不足時為 None"""
+        if len(self.changes) < 2:
+            return None
+        changes = list(self.changes)
+        return statistics.median(b - a for a, b in zip(changes, changes[1:]))
+
+    def window(self) -> float:
+        """預期發布時間前後密集輪詢的半徑：依發布間隔的離散程度放寬，不超過週期的四分之一"""
+        period = self.period
+        changes = list(self.changes)
+        spread = max(abs((b - a) - period) for a, b in zip(changes, changes[1:]))
+        return min(max(self.dense_window, spread), period / 4)
+
+    def expected_publish(self, now: float) -> Optional[float]:
+        """下一次預期發布時間；已過預期時間但仍在密集輪詢範圍內時返回該次時間"""
+        period = self.period
+        if period is None:
+            return None
+        window = self.window()
+        expected = self.changes[-1] + period
+        if expected + window <= now:
+            # 錯過（或上游延遲）的發布跳到下一個週期
+            expected += ((now - expected - window) // period + 1) * period
+        return expected
+
+    def next_delay(self, now: Optional[float] = None) -> float:
+        """距離下一次輪詢的秒數（含抖動）"""
+        now = time.time() if now is None else now
+        expected = self.expected_publish(now)
+        if expected is None:
+            delay = self.default_interval
+        else:
+            until_window = expected - self.window() - now
+            if until_window <= 0:
+                delay = self.dense_interval
+            else:
+                # 稀疏輪詢，但在密集範圍開始時準時醒來
+                delay = max(self.dense_interval, min(self.sparse_interval, until_window))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def describe(self) -> str:
+        period = self.period
+        if period is None:
+            return f"尚未學到發布週期，每 {self.default_interval:.0f} 秒輪詢"
+        return f"發布週期約 {period / 60:.0f} 分鐘，預期發布前後 {self.window() / 60:.0f} 分鐘內密集輪詢"
+
+    def status(self, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        expected = self.expected_publish(now)
+        period = self.period
+        return {
+            'snapshot_marker': self.marker,
+            'publish_period_seconds': round(period) if period is not None else None,
+            'expected_publish_in_seconds': round(expected - now) if expected is not None else None,
+        }
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.marker = data.get('marker')
+            self.changes.extend(float(t) for t in data.get('changes', []))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"讀取更新排程 {self.path} 失敗: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'marker': self.marker, 'changes': list(self.changes)}, f)
+        except OSError as e:
+            logger.warning(f"寫入更新排程 {self.path} 失敗: {e}")
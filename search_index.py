@@ -0,0 +1,134 @@
+"""
+每個快照建立一次的搜索索引：名稱查詢表、正規化鍵與別名查詢表、小寫名稱列表與 BK-tree
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from bk_tree import BKTree
+from item_record import ItemRecord
+from text_normalize import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# 每個快照最多記住的未命中查詢數
+MISS_CACHE_SIZE = 10000
+
+
+def typo_distance(keyword: str) -> int:
+    """錯字容忍的編輯距離：2 字以下不容錯，7 字以下容許 1 個錯字，更長容許 2 個"""
+    if len(keyword) < 3:
+        return 0
+    return 1 if len(keyword) < 8 else 2
+
+
+def load_aliases(path: str) -> Dict[str, str]:
+    """讀取別名表 JSON（{"別名": "物品名稱"}），檔案不存在或格式錯誤時返回空表"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            aliases = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"無法讀取別名表 {path}: {e}")
+        return {}
+    if not isinstance(aliases, dict):
+        logger.warning(f"別名表 {path} 格式錯誤：應為物件")
+        return {}
+    return {str(alias): str(name) for alias, name in aliases.items()}
+
+
+class SearchIndex:
+    """快照的唯讀搜索索引，在 I/O 線程中建立後整個替換"""
+
+    def __init__(self, items: List[ItemRecord], aliases: Optional[Dict[str, str]] = None):
+        self.items_by_name: Dict[str, ItemRecord] = {}
+        self.items_by_key: Dict[str, ItemRecord] = {}  # 正規化名稱與別名
+        self.names: List[str] = []  # 與快照物品列表對齊的小寫名稱
+        for item in items:
+            name = item.item_name.lower()
+            self.items_by_name.setdefault(name, item)
+            self.items_by_key.setdefault(normalize_name(item.item_name), item)
+            self.names.append(name)
+        # BK-tree 只包含物品名稱的正規化鍵，不包含別名
+        self.bk_tree = BKTree(self.items_by_key)
+        # 名稱優先：與物品名稱衝突的別名被忽略
+        for alias, name in (aliases or {}).items():
+            item = self.items_by_key.get(normalize_name(name))
+            if item is not None:
+                self.items_by_key.setdefault(normalize_name(alias), item)
+        # 以換行串接全部名稱，單次 in 即可判斷關鍵字是否為某個名稱的子字串
+        self._joined_names = '\n'.join(self.names)
+        # 名稱（小寫與正規化鍵）中出現過的所有字元，用於快速排除必然無結果的查詢
+        self._alphabet = frozenset(self._joined_names).union(*self.items_by_key)
+        # 未命中查詢 → 建議列表（尚未計算為 None），依最近使用淘汰
+        self._misses: 'OrderedDict[str, Optional[List[ItemRecord]]]' = OrderedDict()
+
+    def lookup(self, keyword: str) -> Optional[ItemRecord]:
+        """O(1) 查詢：完整名稱（不區分大小寫），其次為正規化名稱或別名"""
+        return self.items_by_name.get(keyword.lower()) or self.items_by_key.get(normalize_name(keyword))
+
+    def may_match(self, keyword: str) -> bool:
+        """關鍵字與所有名稱沒有任何共同字元時返回 False
+
+        此時模糊分數為 0、不可能是子字串、編輯距離等於關鍵字長度，各匹配層級都必然落空。
+        """
+        alphabet = self._alphabet
+        return any(char in alphabet for char in keyword.lower()) or \
+            any(char in alphabet for char in normalize_name(keyword))
+
+    def is_known_miss(self, keyword: str) -> bool:
+        key = keyword.lower()
+        if key in self._misses:
+            self._misses.move_to_end(key)
+            return True
+        return False
+
+    def remember_miss(self, keyword: str):
+        key = keyword.lower()
+        if key not in self._misses:
+            self._misses[key] = None
+            if len(self._misses) > MISS_CACHE_SIZE:
+                self._misses.popitem(last=False)
+
+    def contains_substring(self, keyword: str) -> bool:
+        return keyword in self._joined_names
+
+    def typo_match(self, keyword: str) -> Optional[ItemRecord]:
+        """錯字修正：返回編輯距離最小的物品，同距離取交易量較高者；無結果返回 None
+
+        關鍵字已是某個名稱的子字串時交給模糊匹配（子字串加分會選中包含它的名稱）。
+        """
+        if self.contains_substring(keyword.lower()):
+            return None
+        key = normalize_name(keyword)
+        max_distance = typo_distance(key)
+        if not max_distance:
+            return None
+        candidates = self.bk_tree.search(key, max_distance)
+        if not candidates:
+            return None
+        best_distance = candidates[0][0]
+        return max((self.items_by_key[name] for distance, name in candidates if distance == best_distance),
+                   key=lambda item: item.volume)
+
+    def suggest(self, keyword: str, limit: int = 5) -> List[ItemRecord]:
+        """「你是不是要找」建議：以較寬的編輯距離列出最接近的名稱；已知未命中的查詢會快取結果"""
+        cached = self._misses.get(keyword.lower())
+        if cached is not None:
+            return cached[:limit]
+        if not self.may_match(keyword):
+            return []
+        key = normalize_name(keyword)
+        max_distance = max(2, len(key) // 2)
+        candidates = self.bk_tree.search(key, max_distance)
+        candidates.sort(key=lambda candidate: (candidate[0], -self.items_by_key[candidate[1]].volume))
+        suggestions = [self.items_by_key[name] for _, name in candidates[:limit]]
+        if keyword.lower() in self._misses:
+            self._misses[keyword.lower()] = suggestions
+        return suggestions
+
+
+EMPTY_INDEX = SearchIndex([])
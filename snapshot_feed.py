@@ -0,0 +1,150 @@
+"""
+快照變更推送：計算相鄰快照的差異並分發給 SSE 訂閱者
+"""
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from item_record import ItemRecord
+
+# 變更判斷所比較的欄位
+CHANGE_FIELDS = ('low', 'median', 'high', 'volume')
+
+
+def diff_snapshots(old_items: List[ItemRecord], new_items: List[ItemRecord]) -> Dict:
+    """計算兩個快照之間的精簡變更集
+
+    changed 包含新增或任一比較欄位有變動的物品（只列出比較欄位的新值），
+    removed 為新快照中已不存在的物品名稱。
+    """
+    old_by_name = {item.item_name: item for item in old_items}
+    changed = []
+    seen = set()
+    for item in new_items:
+        name = item.item_name
+        seen.add(name)
+        old = old_by_name.get(name)
+        if old is not None and all(getattr(old, field) == getattr(item, field) for field in CHANGE_FIELDS):
+            continue
+        record = {'name': name}
+        for field in CHANGE_FIELDS:
+            record[field] = getattr(item, field)
+        changed.append(record)
+    removed = [name for name in old_by_name if name not in seen]
+    return {'changed': changed, 'removed': removed}
+
+
+def format_event(event: str, data: Dict, event_id: Optional[str] = None) -> bytes:
+    """格式化為 SSE 事件"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class Subscriber:
+    """單一 SSE 連線的待發送事件"""
+
+    def __init__(self, max_pending: int):
+        self.replay: deque = deque()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    async def next_event(self, timeout: float) -> Optional[bytes]:
+        """取得下一個事件；逾時返回 b''，訂閱結束返回 None"""
+        if self.replay:
+            return self.replay.popleft()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return b''
+
+
+class SnapshotFeed:
+    """保存最近的變更集並推送給訂閱者
+
+    每個訂閱者的待發送佇列有上限；慢速客戶端佇列滿時會被標記為溢出，
+    由連線處理器發送 reset 事件後斷線，客戶端應重新拉取完整數據。
+
+    事件 ID 為「啟動 ID:快照版本」。版本號在進程重啟後從頭計算，
+    帶著其他啟動 ID 的游標重連時無法補齊差異，一律發送 reset。
+    """
+
+    def __init__(self, history_size: int = 64, max_pending: int = 16, boot_id: Optional[str] = None):
+        self.boot_id = boot_id or uuid.uuid4().hex[:12]
+        self.history: deque = deque(maxlen=history_size)
+        self.max_pending = max_pending
+        self.subscribers = set()
+        self.current_version = 0
+
+    def on_snapshot(self, version: int, old_items: List[ItemRecord], new_items: List[ItemRecord]):
+        """快照監聽回調：計算差異並發布；比較欄位都沒有變動時不發布"""
+        change_set = diff_snapshots(old_items, new_items)
+        if not change_set['changed'] and not change_set['removed']:
+            return
+        change_set['from_version'] = self.current_version
+        change_set['snapshot_version'] = version
+        self.publish(version, change_set)
+
+    def publish(self, version: int, change_set: Dict):
+        """發布變更集給所有訂閱者"""
+        event = format_event('snapshot', change_set, event_id=f"{self.boot_id}:{version}")
+        self.current_version = version
+        self.history.append((version, event))
+        for subscriber in self.subscribers:
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+
+    @staticmethod
+    def parse_cursor(since: str) -> Tuple[str, int]:
+        """解析「啟動 ID:版本」游標；只有版本號（沒有啟動 ID）時啟動 ID 為空字串，格式錯誤時引發 ValueError"""
+        boot_id, _, version = since.rpartition(':')
+        return boot_id, int(version)
+
+    def _sync_event(self, event: str) -> bytes:
+        return format_event(event, {'snapshot_version': self.current_version, 'boot_id': self.boot_id})
+
+    def reset_event(self) -> bytes:
+        """要求客戶端重新拉取完整數據的事件"""
+        return self._sync_event('reset')
+
+    def subscribe(self, since: Optional[Tuple[str, int]] = None) -> Subscriber:
+        """訂閱變更；since 為客戶端已知的 (啟動 ID, 最後版本)，會先重播之後的變更集"""
+        subscriber = Subscriber(self.max_pending)
+        if since is None:
+            subscriber.replay.append(self._sync_event('ready'))
+        else:
+            boot_id, version = since
+            oldest = self.history[0][0] if self.history else None
+            if boot_id != self.boot_id:
+                # 游標來自重啟前的進程（或沒有啟動 ID），版本號不可比較
+                subscriber.replay.append(self.reset_event())
+            elif version == self.current_version:
+                pass
+            elif oldest is None or version < oldest - 1 or version > self.current_version:
+                # 游標早於保存的歷史，無法補齊差異
+                subscriber.replay.append(self.reset_event())
+            else:
+                subscriber.replay.extend(event for event_version, event in self.history if event_version > version)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def close(self):
+        """通知所有訂閱者結束"""
+        for subscriber in self.subscribers:
+            subscriber.replay.clear()
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
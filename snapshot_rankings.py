@@ -0,0 +1,48 @@
+"""
+快照排行：每個快照只排序一次的熱門、趨勢與各類型列表（在 I/O 線程中與搜索索引一起建立），
+分頁時以游標（快照版本, 位移）直接切片，不必重新排序
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+
+from item_record import ItemRecord
+
+# 趨勢列表只包含價格變化達到此百分比的物品
+TRENDING_MIN_CHANGE = 2
+
+
+class RankingCursor(NamedTuple):
+    """分頁游標：排行種類、類型（僅 type 使用）、建立時的快照版本與位移"""
+    kind: str
+    item_type: Optional[str]
+    version: int
+    offset: int
+
+
+class SnapshotRankings:
+    """單一快照的預先排序列表（排序穩定，同分時保持快照順序）"""
+
+    def __init__(self, items: List[ItemRecord]):
+        self.popular = sorted(items, key=lambda item: item.volume, reverse=True)
+        self.trending = sorted((item for item in items if abs(item.recent_change_percent) >= TRENDING_MIN_CHANGE),
+                               key=lambda item: abs(item.recent_change_percent), reverse=True)
+        # 由已依交易量排序的列表分組，各類型列表自然依交易量排序
+        self.by_type: Dict[str, List[ItemRecord]] = {}
+        for item in self.popular:
+            self.by_type.setdefault(item.item_type, []).append(item)
+
+    def ranked(self, kind: str, item_type: Optional[str] = None) -> List[ItemRecord]:
+        if kind == 'popular':
+            return self.popular
+        if kind == 'trending':
+            return self.trending
+        if kind == 'type':
+            return self.by_type.get(item_type, [])
+        raise ValueError(f"未知的排行種類: {kind}")
+
+    def page(self, cursor: RankingCursor, size: int) -> List[ItemRecord]:
+        """游標所在的一頁，O(頁大小)"""
+        return self.ranked(cursor.kind, cursor.item_type)[cursor.offset:cursor.offset + size]
+
+    def total(self, kind: str, item_type: Optional[str] = None) -> int:
+        return len(self.ranked(kind, item_type))
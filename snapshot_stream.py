@@ -0,0 +1,116 @@
+"""
+快照 JSON 的增量解析：逐塊讀取 {"snapshots": [...]} 並直接輸出 ItemRecord，
+不需先把整個回應內容與完整的 dict 列表同時放在記憶體中
+"""
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, List, Union
+
+from item_record import ItemRecord
+
+# 讀取回應內容的塊大小（位元組）
+CHUNK_SIZE = 64 * 1024
+# 單一物品 JSON 的長度上限，超過則視為格式錯誤而非數據尚未讀完
+MAX_ITEM_SIZE = 64 * 1024
+
+_SNAPSHOTS_KEY = re.compile(r'"snapshots"\s*:\s*\[')
+_WHITESPACE = ' \t\r\n'
+
+
+class SnapshotParseError(ValueError):
+    """快照內容不是預期的 JSON 格式"""
+
+
+class SnapshotStreamParser:
+    """增量解析器：feed() 接收文字塊，返回該塊中完整解析出的物品"""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._state = 'start'  # start -> seek_array -> items -> done
+        self.invalid_items = 0
+
+    def feed(self, text: str) -> List[ItemRecord]:
+        self._buffer += text
+        items = []
+        pos = 0
+        buffer = self._buffer
+
+        if self._state == 'start':
+            stripped = buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                return items
+            if stripped[0] != '{':
+                raise SnapshotParseError("內容不是 JSON 物件")
+            self._state = 'seek_array'
+
+        if self._state == 'seek_array':
+            match = _SNAPSHOTS_KEY.search(buffer)
+            if not match:
+                # 保留結尾一小段，以免鍵名被切在兩個塊之間
+                if len(buffer) > MAX_ITEM_SIZE:
+                    self._buffer = buffer[-64:]
+                return items
+            pos = match.end()
+            self._state = 'items'
+
+        while self._state == 'items':
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE + ',':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                self._state = 'done'
+                pos += 1
+                break
+            try:
+                raw, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if len(buffer) - pos > MAX_ITEM_SIZE:
+                    raise SnapshotParseError(f"無法解析位置 {pos} 的物品")
+                break  # 物品尚未讀完，等待下一塊
+            item = ItemRecord.from_dict(raw)
+            if item is None:
+                self.invalid_items += 1
+            else:
+                items.append(item)
+            pos = end
+
+        self._buffer = buffer[pos:] if self._state != 'done' else ''
+        return items
+
+    def close(self):
+        """確認內容已完整結束"""
+        if self._state != 'done':
+            raise SnapshotParseError("快照內容不完整或格式錯誤")
+
+
+def _decode_chunks(chunks: Iterable[Union[bytes, str]]) -> Iterator[str]:
+    """把位元組塊解碼為文字（處理跨塊的多位元組字元）"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_text_chunks(text: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    """把已在記憶體中的文字切成塊"""
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def parse_snapshot_stream(chunks: Iterable[Union[bytes, str]]) -> List[ItemRecord]:
+    """解析整個快照串流，返回驗證過的物品記錄"""
+    parser = SnapshotStreamParser()
+    items = []
+    for text in _decode_chunks(chunks):
+        items.extend(parser.feed(text))
+    parser.close()
+    return items
@@ -0,0 +1,151 @@
+"""
+合成快照生成器：產生與 artale-market.org /api/price-snapshots 格式相同的物品數據，
+供基準測試與評估腳本在離線環境使用
+"""
+
+import math
+import random
+from typing import Dict, List
+
+from item_record import ItemRecord
+
+SNAPSHOT_DATE = '2024-01-01'
+
+# 固定存在於每個合成快照中的常見物品（評估查詢以這些名稱為標準答案）
+ANCHOR_ITEMS = [
+    ('楓葉', '其他'),
+    ('紅色藥水', '消耗品'),
+    ('橙色藥水', '消耗品'),
+    ('白色藥水', '消耗品'),
+    ('藍色藥水', '消耗品'),
+    ('特殊藥水', '消耗品'),
+    ('萬能療傷藥', '消耗品'),
+    ('回城卷軸', '消耗品'),
+    ('披風幸運卷軸 60%', '卷軸'),
+    ('頭盔防禦卷軸 10%', '卷軸'),
+    ('單手劍攻擊卷軸 60%', '卷軸'),
+    ('手套攻擊卷軸 60%', '卷軸'),
+    ('手套攻擊卷軸 10%', '卷軸'),
+    ('耳環智力卷軸 10%', '卷軸'),
+    ('褐色工地手套', '裝備'),
+    ('黑色魔法師帽', '裝備'),
+    ('紅色皮克拉布', '裝備'),
+    ('楓葉盾牌', '裝備'),
+    ('藍色皇家長袍', '裝備'),
+    ('鋼鐵巨斧', '裝備'),
+    ('火焰之劍', '裝備'),
+    ('黑水晶', '材料'),
+    ('紫水晶', '材料'),
+    ('鋼鐵', '材料'),
+    ('黃金', '材料'),
+    ('祝福卷軸', '卷軸'),
+    ('混沌卷軸 60%', '卷軸'),
+    ('白醫卷軸', '卷軸'),
+    ('扎昆頭盔', '裝備'),
+    ('殘暴炎魔的眼睛', '其他'),
+    ('烏龜殼', '材料'),
+    ('獵人之弓', '裝備'),
+    ('極限藥水', '消耗品'),
+    ('時間之石', '其他'),
+    ('閃耀的飾品', '裝備'),
+    ('進階魔法書', '其他'),
+    ('魔術師披風', '裝備'),
+    ('寬邊帽', '裝備'),
+]
+
+_QUALITIES = ['', '', '', '精良的', '稀有的', '強化', '祝福的', '詛咒的', '遠古', '改良型']
+_COLORS = ['紅色', '藍色', '綠色', '黃色', '黑色', '白色', '紫色', '橙色', '褐色', '灰色',
+           '金色', '銀色', '青色', '粉紅色', '暗紅色', '深藍色', '淺綠色', '雪白', '翡翠', '琥珀']
+_MATERIALS = ['青銅', '鋼鐵', '秘銀', '黃金', '水晶', '皮革', '絲綢', '骨製', '木製', '寒冰',
+              '火焰', '雷電', '暗影', '聖光', '龍鱗', '楓葉', '星光', '月光', '古代', '傳說']
+_EQUIP_BASES = ['頭盔', '帽子', '長袍', '盔甲', '褲裙', '手套', '鞋子', '披風', '盾牌', '耳環',
+                '單手劍', '雙手劍', '單手斧', '雙手斧', '短杖', '長杖', '弓', '弩', '拳套', '短劍',
+                '長槍', '矛', '指虎', '火槍', '項鍊', '戒指', '腰帶', '肩甲', '面具', '眼鏡']
+_SCROLL_TARGETS = ['頭盔', '披風', '手套', '鞋子', '耳環', '上衣', '褲裙', '盾牌', '單手劍', '雙手劍',
+                   '單手斧', '雙手斧', '短杖', '長杖', '弓', '弩', '拳套', '短劍', '長槍', '指虎']
+_SCROLL_STATS = ['攻擊', '魔力', '防禦', '力量', '敏捷', '智力', '幸運', '體力', '跳躍', '速度']
+_SCROLL_PREFIXES = ['', '', '黑暗', '乾淨的', '完美的', '驚人的', '榮耀的', '古老的', '神秘的', '閃耀的']
+_SCROLL_RATES = ['10%', '30%', '60%', '70%', '100%']
+_CONSUMABLE_BASES = ['藥水', '藥丸', '料理', '果汁', '便當', '蛋糕', '飲料', '靈藥', '藥劑', '糖果']
+_MATERIAL_BASES = ['礦石', '母礦', '碎片', '結晶', '原石', '寶石', '羽毛', '皮毛', '角', '牙']
+_MONSTER_PARTS = ['嫩寶', '綠水靈', '菇菇仔', '肥肥', '石巨人', '木妖', '星光精靈', '幽靈',
+                  '蝙蝠魔', '蜥蜴', '鱷魚', '企鵝', '雪人', '狼人', '巴洛古', '殘暴炎魔', '拉圖斯', '皮卡啾']
+_ETC_SUFFIXES = ['的殼', '的尾巴', '的翅膀', '的眼睛', '的角', '的牙齒', '的毛皮', '的碎片', '的核心', '的心臟']
+
+# (類型, 對數中位價格均值, 對數標準差)
+_TYPE_PRICE_PARAMS = {
+    '裝備': (math.log(800_000), 1.6),
+    '卷軸': (math.log(1_500_000), 1.4),
+    '消耗品': (math.log(2_000), 1.0),
+    '材料': (math.log(30_000), 1.2),
+    '其他': (math.log(15_000), 1.3),
+}
+_TYPE_WEIGHTS = [('裝備', 0.4), ('卷軸', 0.2), ('消耗品', 0.1), ('材料', 0.15), ('其他', 0.15)]
+
+
+def _random_name(rng: random.Random, item_type: str) -> str:
+    """依類型組合一個物品名稱"""
+    quality = rng.choice(_QUALITIES)
+    if item_type == '裝備':
+        name = f"{quality}{rng.choice(_COLORS)}{rng.choice(_MATERIALS)}{rng.choice(_EQUIP_BASES)}"
+        if rng.random() < 0.5:
+            name += f" (Lv.{rng.randrange(10, 121, 5)})"
+        return name
+    if item_type == '卷軸':
+        return f"{rng.choice(_SCROLL_PREFIXES)}{rng.choice(_SCROLL_TARGETS)}{rng.choice(_SCROLL_STATS)}卷軸 {rng.choice(_SCROLL_RATES)}"
+    if item_type == '消耗品':
+        return f"{quality}{rng.choice(_COLORS)}{rng.choice(_MATERIALS)}{rng.choice(_CONSUMABLE_BASES)}"
+    if item_type == '材料':
+        return f"{quality}{rng.choice(_COLORS)}{rng.choice(_MATERIALS)}{rng.choice(_MATERIAL_BASES)}"
+    return f"{quality}{rng.choice(_COLORS)}{rng.choice(_MONSTER_PARTS)}{rng.choice(_ETC_SUFFIXES)}"
+
+
+def _random_item(rng: random.Random, name: str, item_type: str) -> Dict:
+    """生成一筆具有合理價格分佈的物品數據"""
+    mu, sigma = _TYPE_PRICE_PARAMS[item_type]
+    median = max(1, int(rng.lognormvariate(mu, sigma)))
+    low = max(1, int(median * rng.uniform(0.5, 0.95)))
+    high = max(median, int(median * rng.uniform(1.05, 2.5)))
+    # 交易量呈長尾分佈，少數熱門物品佔大部分交易
+    volume = int(rng.paretovariate(1.2)) - 1
+    change = rng.gauss(0, 6) if rng.random() < 0.7 else 0.0
+    return {
+        'item_name': name,
+        'item_type': item_type,
+        'low': low,
+        'median': median,
+        'high': high,
+        'volume': volume,
+        'recent_change_percent': round(change, 2),
+        'snapshot_date': SNAPSHOT_DATE,
+    }
+
+
+def generate_items(count: int, seed: int = 42) -> List[Dict]:
+    """生成 count 筆名稱不重複的合成物品數據（包含 ANCHOR_ITEMS）"""
+    rng = random.Random(seed)
+    types = [t for t, _ in _TYPE_WEIGHTS]
+    weights = [w for _, w in _TYPE_WEIGHTS]
+
+    items = []
+    names = set()
+    for name, item_type in ANCHOR_ITEMS[:count]:
+        names.add(name)
+        items.append(_random_item(rng, name, item_type))
+
+    while len(items) < count:
+        item_type = rng.choices(types, weights)[0]
+        name = _random_name(rng, item_type)
+        if name in names:
+            # 組合空間用盡時加上編號避免重複
+            name = f"{name} #{len(items)}"
+        names.add(name)
+        items.append(_random_item(rng, name, item_type))
+
+    rng.shuffle(items)
+    return items
+
+
+def generate_records(count: int, seed: int = 42) -> List[ItemRecord]:
+    """生成 count 筆合成物品記錄（與爬蟲快取相同的表示）"""
+    return [ItemRecord.from_dict(item) for item in generate_items(count, seed)]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+測試熱門查詢預熱不會把匹配區段寫入觸發快照更新的查詢追蹤
+"""
+
+import asyncio
+
+import main
+import tracing
+from synthetic_catalog import generate_records
+
+
+async def _query_during_refresh():
+    scraper = main.scraper
+    items = generate_records(2000)
+    scraper._fetch_data_with_strategies = lambda: items
+    # 熱門查詢使用精確名稱，與下方查詢命中的層級不同
+    for record in items[:5]:
+        for _ in range(3):
+            scraper.query_stats.add(record.item_name.lower(), record.item_name)
+
+    # 尚無快照：查詢會等待更新，快照監聽器在此查詢的追蹤中被呼叫
+    with tracing.start_trace('query', keyword='不存在的道具') as trace:
+        await scraper.search_item_price('不存在的道具')
+    own_spans = len(trace.spans)
+    own_tier = trace.attributes.get('tier')
+
+    # 讓背景預熱執行完畢
+    for _ in range(100):
+        if main._prewarmed_version == scraper.snapshot_version:
+            break
+        await asyncio.sleep(0.01)
+    await scraper.close()
+    return trace, own_spans, own_tier, main._prewarmed_version
+
+
+def test_prewarm_does_not_join_query_trace():
+    """預熱完成後，查詢的追蹤沒有新增區段，命中層級也沒有被覆蓋"""
+    trace, own_spans, own_tier, prewarmed_version = asyncio.run(_query_during_refresh())
+    names = [span.name for span in trace.spans]
+    print(f"🔍 查詢追蹤區段 {names}，層級 {own_tier}，預熱版本 {prewarmed_version}")
+
+    assert prewarmed_version == 1, "預熱沒有執行"
+    # 預熱與查詢同時進行；若混入追蹤，每個預熱查詢會多出一組 cache 與 match.exact 區段
+    assert names.count('cache') == 1 and names.count('match.exact') == 1, names
+    assert len(trace.spans) == own_spans, names[own_spans:]
+    assert trace.attributes.get('tier') == own_tier == 'miss'
+    assert all(span.start <= trace.end for span in trace.spans)
+
+
+if __name__ == "__main__":
+    test_prewarm_does_not_join_query_trace()
+    print("🎉 測試完成！")
@@ -0,0 +1,57 @@
+"""
+中文名稱正規化：全形/半形折疊（NFKC）、繁簡折疊、大小寫，以及去除空白與標點
+
+物品在建立索引時正規化一次，查詢時正規化一次，兩者以 dict 直接比對。
+"""
+
+import functools
+import unicodedata
+
+try:
+    # 安裝 OpenCC 時使用完整的繁轉簡詞庫
+    from opencc import OpenCC
+    _opencc_convert = OpenCC('t2s').convert
+except Exception:
+    _opencc_convert = None
+
+# 內建的繁→簡對照（遊戲物品名稱常用字），未安裝 OpenCC 時使用
+_TRADITIONAL = (
+    '楓葉紅藥療傷萬軸風運禦劍擊環師藍長鋼鐵黃醫頭殘強詛遠綠銀淺銅絲綢製電聖龍鱗傳說'
+    '褲單雙槍項鍊帶鏡體躍乾淨驚榮閃當飲靈劑礦結寶鱷魚鵝圖殼齒臟鐘錢幣貓豬蝸惡騎獸標'
+    '億書頁裝備護鈴門開關燈樹蟲鳥馬雞鴨羅達爾麥奧瑪麗為們個這國學會時點數無遺跡戰'
+    '鬥殺燒歐貝級鑽幾發髮將鋒銳鎧彈飛鳳雲錘鎚輪盜賊煉寵蘋蔔蘿鑰實驗經廢棄變團隊務'
+    '獎勵禮換購買賣價週錄紀號碼鑲補給擴氣壓舊輕專屬銘稱陽陰島嶼峽灣漢堅韌彌賜靜聲'
+    '歸亂儀緣線網絨綿紗織縫紋純鍛鑄鏽鋸鏈鐮錦鍍飾獵極進階間術龜烏'
+)
+_SIMPLIFIED = (
+    '枫叶红药疗伤万轴风运御剑击环师蓝长钢铁黄医头残强诅远绿银浅铜丝绸制电圣龙鳞传说'
+    '裤单双枪项链带镜体跃干净惊荣闪当饮灵剂矿结宝鳄鱼鹅图壳齿脏钟钱币猫猪蜗恶骑兽标'
+    '亿书页装备护铃门开关灯树虫鸟马鸡鸭罗达尔麦奥玛丽为们个这国学会时点数无遗迹战'
+    '斗杀烧欧贝级钻几发发将锋锐铠弹飞凤云锤锤轮盗贼炼宠苹卜萝钥实验经废弃变团队务'
+    '奖励礼换购买卖价周录纪号码镶补给扩气压旧轻专属铭称阳阴岛屿峡湾汉坚韧弥赐静声'
+    '归乱仪缘线网绒绵纱织缝纹纯锻铸锈锯链镰锦镀饰猎极进阶间术龟乌'
+)
+_FOLD_TABLE = str.maketrans(_TRADITIONAL, _SIMPLIFIED)
+
+# 去除的 Unicode 類別：標點（P）、空白與分隔符（Z）、控制字元（C）
+_STRIP_CATEGORIES = frozenset('PZC')
+
+
+@functools.lru_cache(maxsize=65536)
+def _opencc_fold(text: str) -> str:
+    # 純 Python 的 OpenCC 每個名稱約需數十微秒；物品名稱在快照之間大多相同，快取轉換結果
+    return _opencc_convert(text)
+
+
+def fold_chinese(text: str) -> str:
+    """繁簡折疊：統一轉為簡體字形，繁體與簡體查詢得到相同結果"""
+    if _opencc_convert is not None:
+        return _opencc_fold(text)
+    return text.translate(_FOLD_TABLE)
+
+
+def normalize_name(text: str) -> str:
+    """返回用於比對的正規化鍵"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = ''.join(char for char in text if unicodedata.category(char)[0] not in _STRIP_CATEGORIES)
+    return fold_chinese(text)
@@ -0,0 +1,205 @@
+"""
+查詢追蹤：每個查詢一個關聯 ID，記錄各階段的時間區段（span），
+可輸出為 JSON Lines，超過門檻的慢查詢會把完整分解寫入日誌
+
+追蹤上下文存放在 contextvars 中，透過 wrap() 提交到線程池的工作會沿用同一個追蹤。
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 設置後每個追蹤以一行 JSON 附加到此檔案
+TRACE_LOG_PATH = os.getenv('TRACE_LOG_PATH')
+# 總耗時超過此毫秒數的查詢寫入慢查詢日誌
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 5000))
+
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('trace', default=None)
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('span', default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    """追蹤中的一個時間區段"""
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'start', 'end', 'thread', 'attributes')
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], start: float, attributes: Dict):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = start
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self, origin: float) -> Dict:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(((self.end or self.start) - self.start) * 1000, 3),
+            'thread': self.thread,
+            'attributes': self.attributes,
+        }
+
+
+class _NoopSpan:
+    """沒有進行中的追蹤時使用，避免呼叫端判斷"""
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """一個查詢的所有 span；span 可能由線程池中的線程加入"""
+
+    def __init__(self, name: str, attributes: Dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def new_span(self, name: str, parent: Optional[Span], start: float, attributes: Dict) -> Span:
+        with self._lock:
+            span = Span(name, len(self.spans) + 1, parent.span_id if parent else None, start, attributes)
+            self.spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = [span.to_dict(self.start) for span in self.spans]
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'spans': spans,
+        }
+
+    def format_breakdown(self) -> str:
+        """以縮排列出各 span 的開始時間與耗時"""
+        with self._lock:
+            spans = list(self.spans)
+        depth = {}
+        lines = []
+        for span in spans:
+            depth[span.span_id] = depth.get(span.parent_id, -1) + 1
+            duration = ((span.end or self.end or span.start) - span.start) * 1000
+            attributes = ' '.join(f'{key}={value}' for key, value in span.attributes.items())
+            lines.append(f"  {'  ' * depth[span.span_id]}+{(span.start - self.start) * 1000:>9.1f} ms "
+                         f"{span.name} {duration:.1f} ms {attributes}".rstrip())
+        return '\n'.join(lines)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def annotate(**attributes):
+    """在目前的追蹤上加入屬性（例如命中的匹配層級）"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """開始一個新追蹤；結束時輸出 JSON Lines 並檢查是否為慢查詢"""
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _finish(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """在目前的追蹤中記錄一個區段；沒有追蹤時不做任何事"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+    current = trace.new_span(name, _current_span.get(), time.perf_counter(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def record(name: str, start: float, **attributes):
+    """記錄一個已結束的區段（start 為 time.perf_counter() 的值，結束於現在）"""
+    trace = _current_trace.get()
+    if trace is not None:
+        finished = trace.new_span(name, _current_span.get(), start, attributes)
+        finished.end = time.perf_counter()
+
+
+def _run_traced(context: contextvars.Context, submitted: float, queue: str, func, args):
+    # 排隊等待：從提交到線程開始執行
+    context.run(record, f'queue_wait.{queue}', submitted)
+    return context.run(func, *args)
+
+
+def wrap(func, *args, queue: str = 'executor'):
+    """包裝要提交到線程池的函數，使其沿用目前的追蹤並記錄排隊等待時間
+
+    返回的可呼叫物件包含上下文，不能提交到進程池。
+    """
+    context = contextvars.copy_context()
+    submitted = time.perf_counter()
+    return lambda: _run_traced(context, submitted, queue, func, args)
+
+
+def _finish(trace: Trace):
+    if TRACE_LOG_PATH:
+        try:
+            line = json.dumps(trace.to_dict(), ensure_ascii=False)
+            with _export_lock, open(TRACE_LOG_PATH, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"寫入追蹤記錄失敗: {e}")
+
+    if trace.duration_ms >= SLOW_QUERY_MS:
+        attributes = ' '.join(f'{key}={value}' for key, value in trace.attributes.items())
+        logger.warning(f"慢查詢 {trace.trace_id} {trace.name} 耗時 {trace.duration_ms:.1f} ms {attributes}\n"
+                       f"{trace.format_breakdown()}")
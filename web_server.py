@@ -0,0 +1,198 @@
+"""
+與 Discord 機器人共用事件循環的 aiohttp HTTP 服務器
+"""
+
+import asyncio
+import functools
+import json
+from aiohttp import web
+import metrics
+from snapshot_feed import SnapshotFeed
+
+# API 列表的最大筆數
+MAX_LIST_LIMIT = 100
+# SSE 心跳間隔與單次寫入逾時（秒）
+STREAM_HEARTBEAT = 15
+STREAM_WRITE_TIMEOUT = 10
+
+_dumps = functools.partial(json.dumps, ensure_ascii=False)
+
+
+def _parse_limit(request: web.Request, default: int) -> int:
+    """解析 limit 查詢參數"""
+    try:
+        limit = int(request.query.get('limit', default))
+    except ValueError:
+        raise web.HTTPBadRequest(text='limit 必須是整數')
+    return max(1, min(limit, MAX_LIST_LIMIT))
+
+
+class WebServer:
+    """健康檢查與指標 HTTP 服務器"""
+
+    def __init__(self, bot, scraper, host: str = '0.0.0.0', port: int = 10000):
+        self.bot = bot
+        self.scraper = scraper
+        self.host = host
+        self.port = port
+        self.runner = None
+        self.feed = SnapshotFeed()
+        self.feed.current_version = scraper.snapshot_version
+        scraper.add_snapshot_listener(self.feed.on_snapshot)
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get('/', self.handle_index),
+            web.get('/health', self.handle_health),
+            web.get('/metrics', self.handle_metrics),
+            web.get('/api/search', self.handle_search),
+            web.get('/api/item/{name}', self.handle_item),
+            web.get('/api/popular', self.handle_popular),
+            web.get('/api/trending', self.handle_trending),
+            web.get('/api/stream', self.handle_stream),
+        ])
+
+    async def handle_index(self, request: web.Request) -> web.Response:
+        """機器人狀態"""
+        return web.json_response({
+            "status": "running",
+            "service": "Artale Market Discord Bot",
+            "bot_user": str(self.bot.user) if self.bot.user else "Connecting..."
+        })
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """健康檢查；上游無法連線時仍返回 200（機器人繼續提供最後一次成功的快照）"""
+        if request.query.get('verbose'):
+            return web.json_response(self.scraper.upstream_status(), dumps=_dumps)
+        return web.Response(text='OK')
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """Prometheus 指標"""
+        return web.Response(
+            body=metrics.render().encode(),
+            headers={'Content-Type': metrics.CONTENT_TYPE}
+        )
+
+    async def _api_response(self, request: web.Request, build) -> web.StreamResponse:
+        """以目前快照回應 API 請求，支援 ETag/304 與 gzip
+
+        build 為協程函數，返回 (狀態碼, 內容)。
+        """
+        self.scraper.record_cache_lookup()
+        version = await self.scraper.ensure_snapshot()
+        if not version:
+            return web.json_response({"error": "snapshot_unavailable"}, status=503, dumps=_dumps)
+        
+        # ETag 以快照版本為準，快照更新前同一資源內容不變
+        etag = f'W/"snapshot-{version}"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+        if_none_match = request.headers.get('If-None-Match', '')
+        if any(tag.strip() in (etag, '*') for tag in if_none_match.split(',')):
+            return web.Response(status=304, headers=headers)
+        
+        status, payload = await build()
+        payload['snapshot_version'] = version
+        upstream = self.scraper.upstream_status()
+        payload['snapshot_age_seconds'] = upstream['snapshot_age_seconds']
+        payload['stale'] = upstream['stale']
+        response = web.json_response(payload, status=status, headers=headers, dumps=_dumps)
+        if 'gzip' in request.headers.get('Accept-Encoding', '').lower():
+            response.enable_compression(web.ContentCoding.gzip)
+        return response
+
+    async def handle_search(self, request: web.Request) -> web.StreamResponse:
+        """/api/search?q= 與機器人相同的搜索邏輯"""
+        keyword = request.query.get('q', '').strip()
+        if not keyword:
+            raise web.HTTPBadRequest(text='缺少查詢參數 q')
+
+        async def build():
+            result = await self.scraper.search_item_price(keyword)
+            if result is None:
+                return 404, {"error": "not_found", "query": keyword}
+            return 200, {"query": keyword, "item": result}
+
+        return await self._api_response(request, build)
+
+    async def handle_item(self, request: web.Request) -> web.StreamResponse:
+        """/api/item/<name> 依完整名稱查詢"""
+        name = request.match_info['name']
+
+        async def build():
+            result = await self.scraper.get_item(name)
+            if result is None:
+                return 404, {"error": "not_found", "name": name}
+            return 200, {"item": result}
+
+        return await self._api_response(request, build)
+
+    async def handle_popular(self, request: web.Request) -> web.StreamResponse:
+        """/api/popular 熱門物品"""
+        limit = _parse_limit(request, 10)
+
+        async def build():
+            return 200, {"items": await self.scraper.get_popular_items(limit)}
+
+        return await self._api_response(request, build)
+
+    async def handle_trending(self, request: web.Request) -> web.StreamResponse:
+        """/api/trending 趨勢物品"""
+        limit = _parse_limit(request, 10)
+
+        async def build():
+            return 200, {"items": await self.scraper.get_trending_items(limit)}
+
+        return await self._api_response(request, build)
+
+    async def handle_stream(self, request: web.Request) -> web.StreamResponse:
+        """/api/stream 以 SSE 推送快照變更集
+
+        重連時以 Last-Event-ID 標頭或 ?since= 指定已知的最後事件 ID（啟動 ID:版本），會先重播之後的變更。
+        """
+        since = request.headers.get('Last-Event-ID') or request.query.get('since')
+        if since is not None:
+            try:
+                since = self.feed.parse_cursor(since)
+            except ValueError:
+                raise web.HTTPBadRequest(text='since 必須是事件 ID（啟動 ID:版本）')
+        
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+        await response.prepare(request)
+        
+        subscriber = self.feed.subscribe(since)
+        try:
+            while True:
+                if subscriber.overflowed and not subscriber.replay:
+                    # 客戶端跟不上推送速度，要求其重新同步
+                    await response.write(self.feed.reset_event())
+                    break
+                event = await subscriber.next_event(STREAM_HEARTBEAT)
+                if event is None:
+                    break
+                await asyncio.wait_for(response.write(event or b': keepalive\n\n'), STREAM_WRITE_TIMEOUT)
+        except (ConnectionResetError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.feed.unsubscribe(subscriber)
+        return response
+
+    async def start(self):
+        """在目前的事件循環上啟動服務器"""
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+
+    async def stop(self):
+        """停止服務器並等待進行中的請求結束"""
+        self.feed.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None